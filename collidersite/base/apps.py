@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BaseConfig(AppConfig):
+    name = 'collidersite.base'
+
+    def ready(self):
+        # Connect the cache invalidation receivers
+        from collidersite.base import signals  # noqa
+        # Register the shared cache check
+        from collidersite.base import checks  # noqa
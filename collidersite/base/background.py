@@ -0,0 +1,55 @@
+"""
+A single background worker thread per process, for work that shouldn't hold
+up the request that triggered it (re-rendering stale cached pages, ...).
+Tasks run one at a time in the order they were queued. A process that exits
+(a management command, a server shutting down) first waits for the tasks it
+queued to finish, as the thread dies with it.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections, reset_queries
+from django.utils.six.moves import queue
+
+
+logger = logging.getLogger(__name__)
+
+_tasks = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(func, *args, **kwargs):
+    global _worker
+    with _worker_lock:
+        # Started lazily so that each forked server process gets its own
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name='collidersite-background')
+            _worker.daemon = True
+            _worker.start()
+    _tasks.put((func, args, kwargs))
+
+
+def _run():
+    while True:
+        func, args, kwargs = _tasks.get()
+        # Page re-renders count their queries from the end of the query log,
+        # which stops growing once full unless it is emptied between tasks
+        reset_queries()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %r failed", func)
+        finally:
+            # The thread outlives any request, so it has to tidy up its own
+            # database connection
+            close_old_connections()
+            _tasks.task_done()
+
+
+@atexit.register
+def _drain():
+    if _worker is not None and _worker.is_alive():
+        _tasks.join()
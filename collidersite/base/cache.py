@@ -0,0 +1,70 @@
+import time
+
+from django.core.cache import cache
+
+from collidersite.base import metrics
+
+
+# Every cached structure derived from the page tree (menus, breadcrumbs, ...)
+# includes this version in its cache key. Bumping the version on publish,
+# unpublish, move or delete makes all of them stale at once, without having
+# to know which keys exist.
+PAGE_TREE_VERSION_KEY = 'collidersite:page-tree-version'
+
+# Bumped whenever something shown on many pages but stored outside the page
+# tree (snippets, images) changes. Only the page cache depends on it.
+CONTENT_VERSION_KEY = 'collidersite:content-version'
+
+# Versioned entries are never read again once the version moves on, so they
+# only need to live long enough to be useful between publishes.
+PAGE_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so that an evicted version never
+        # lines up with keys written under an earlier one.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version has been evicted, so nothing can be served from the
+        # old keys anyway; seed a fresh one.
+        get_version(key)
+
+
+def get_page_tree_version():
+    return get_version(PAGE_TREE_VERSION_KEY)
+
+
+def bump_page_tree_version():
+    bump_version(PAGE_TREE_VERSION_KEY)
+
+
+def get_content_version():
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def get_or_build(key, build, timeout=None):
+    """
+    Return the value cached under `key`, calling `build()` and storing its
+    result on a miss. `build` may return any picklable value except None.
+    """
+    value = cache.get(key)
+    if value is None:
+        metrics.record_cache(misses=1)
+        value = build()
+        cache.set(key, value, timeout)
+    else:
+        metrics.record_cache(hits=1)
+    return value
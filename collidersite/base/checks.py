@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+# Cache backends whose entries only exist in the process that wrote them
+LOCAL_CACHE_BACKENDS = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The page tree and content versions of base/cache.py, and the page cache
+    purges, are written to the default cache by whichever process handles
+    the publish. Other processes only see them if the cache is shared.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    if getattr(settings, 'PAGE_CACHE_ENABLED', False):
+        return [Error(
+            "PAGE_CACHE_ENABLED requires a default cache shared between "
+            "processes, not {}.".format(backend),
+            hint="Set CACHE_URL (e.g. to Redis or Memcached), or turn "
+                 "PAGE_CACHE_ENABLED off.",
+            id='collidersite.E001',
+        )]
+    if not settings.DEBUG:
+        return [Warning(
+            "The default cache ({}) isn't shared between processes, so menus, "
+            "breadcrumbs and the footer may stay stale for a day in the "
+            "processes that didn't handle a publish.".format(backend),
+            hint="Set CACHE_URL (e.g. to Redis or Memcached) when running "
+                 "more than one process.",
+            id='collidersite.W001',
+        )]
+    return []
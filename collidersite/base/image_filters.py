@@ -0,0 +1,376 @@
+"""
+Faster generation of image renditions.
+
+Wagtail's Filter.run decodes the whole source image and then crops and
+resizes it, once per rendition. Our sources are uploaded 1000-3000px wide
+but mostly shown as thumbnails, so most of that work is thrown away.
+FastFilter first works out the box of the source image each rendition shows
+and its output size, by running the filter's operations on RenditionSize
+instead of the image, and then:
+
+- has Pillow decode JPEGs at 1/2, 1/4 or 1/8 of their size (draft mode)
+  when that still leaves OVERSAMPLING times the pixels the renditions need,
+- applies the EXIF orientation after decoding, to the smaller image,
+- makes all the renditions of one image that create_renditions is asked
+  for out of the same decoded image, the smaller ones out of a downscaled
+  copy of it.
+
+The operations see the full size image, focal point included, so the crops
+and output sizes are exactly Wagtail's.
+
+With RENDITIONS_WEBP, create_renditions also saves a WebP copy of each new
+rendition next to its file, which templates offer to the browsers that
+support it (see get_webp_url), through the serve_rendition view if it
+doesn't exist yet (see get_webp).
+
+make_placeholder makes the ImagePlaceholder of an image the same way, out of
+a JPEG decoded at 1/8 of its size.
+"""
+import base64
+import math
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+
+import PIL.Image
+from willow.plugins.pillow import PillowImage
+
+from wagtail.wagtailimages.models import Filter
+
+
+# The decoded image (and each downscaled copy) keeps at least this many
+# source pixels per rendition pixel, for the resampling filter to work with
+OVERSAMPLING = 2
+
+# The file extensions Wagtail gives renditions, by format
+FORMAT_EXTENSIONS = {
+    'jpeg': '.jpg',
+    'png': '.png',
+    'gif': '.gif',
+}
+
+WEBP_QUALITY = 80
+
+# How long whether the WebP version of a rendition exists is remembered: a
+# missing one only briefly, as the serve_rendition view soon makes it.
+WEBP_EXISTS_TIMEOUT = 60 * 60 * 24
+WEBP_MISSING_TIMEOUT = 60 * 5
+
+# The largest side of the micro-thumbnail of ImagePlaceholder, which the
+# browser blurs as it scales it up
+PLACEHOLDER_SIZE = 16
+
+EXIF_ORIENTATION = 0x0112
+
+ORIENTATION_TRANSPOSES = {
+    2: (PIL.Image.FLIP_LEFT_RIGHT,),
+    3: (PIL.Image.ROTATE_180,),
+    4: (PIL.Image.ROTATE_180, PIL.Image.FLIP_LEFT_RIGHT),
+    5: (PIL.Image.ROTATE_270, PIL.Image.FLIP_LEFT_RIGHT),
+    6: (PIL.Image.ROTATE_270,),
+    7: (PIL.Image.ROTATE_90, PIL.Image.FLIP_LEFT_RIGHT),
+    8: (PIL.Image.ROTATE_90,),
+}
+
+
+class RenditionSize(object):
+    """
+    Stands in for a Willow image in Wagtail's image operations, which only
+    resize and crop it, to work out the size of a rendition and the `box`
+    of the source image it shows without opening the image file.
+    """
+    def __init__(self, width, height, box=None):
+        self.width = width
+        self.height = height
+        self.box = box or (0, 0, width, height)
+
+    def get_size(self):
+        return self.width, self.height
+
+    def resize(self, size):
+        return RenditionSize(size[0], size[1], self.box)
+
+    def crop(self, rect):
+        left, top, right, bottom = self.box
+        scale_x = (right - left) / self.width
+        scale_y = (bottom - top) / self.height
+        return RenditionSize(rect.width, rect.height, (
+            left + rect.left * scale_x, top + rect.top * scale_y,
+            left + rect.right * scale_x, top + rect.bottom * scale_y,
+        ))
+
+
+class Rendering(object):
+    """
+    How the rendition of `image_filter` is made out of `image`, whose
+    source is `size` once oriented.
+    """
+    def __init__(self, image_filter, image, size):
+        self.filter = image_filter
+        self.env = {}
+        plan = RenditionSize(*size)
+        for operation in image_filter.operations:
+            plan = operation.run(plan, image, self.env) or plan
+        self.box = plan.box
+        self.size = plan.get_size()
+
+        # The smallest size of the whole source image that still has
+        # OVERSAMPLING pixels per rendition pixel in the box
+        left, top, right, bottom = self.box
+        scale = min(1, OVERSAMPLING * max(
+            self.size[0] / (right - left), self.size[1] / (bottom - top)))
+        self.source_size = (
+            int(math.ceil(size[0] * scale)), int(math.ceil(size[1] * scale)))
+
+    def run(self, source, size, original_format, webp=False):
+        """
+        Make the rendition out of `source`, the oriented source image
+        scaled down from `size`. Returns a Willow image file, with the WebP
+        version of the rendition as `webp` if it is asked for.
+        """
+        scale_x = source.size[0] / size[0]
+        scale_y = source.size[1] / size[1]
+        left, top, right, bottom = self.box
+        box = (
+            max(0, int(round(left * scale_x))),
+            max(0, int(round(top * scale_y))),
+            min(source.size[0], int(round(right * scale_x))),
+            min(source.size[1], int(round(bottom * scale_y))),
+        )
+
+        willow = PillowImage(source)
+        if box != (0, 0) + source.size:
+            willow = willow.crop(box)
+        if willow.get_size() != self.size:
+            willow = willow.resize(self.size)
+        generated_image = save(willow, self.env, original_format, BytesIO())
+        generated_image.webp = encode_webp(willow.image) if webp else None
+        return generated_image
+
+
+def save(willow, env, original_format, output):
+    # Saves in the format and quality Filter.run would have picked
+    output_format = env.get('output-format')
+    if output_format is None:
+        output_format = original_format
+        # Convert BMP files and unanimated GIFs to PNG
+        if original_format == 'bmp':
+            output_format = 'png'
+        if original_format == 'gif' and not willow.has_animation():
+            output_format = 'png'
+
+    if output_format == 'jpeg':
+        quality = env.get(
+            'jpeg-quality', getattr(settings, 'WAGTAILIMAGES_JPEG_QUALITY', 85))
+        return willow.save_as_jpeg(output, quality=quality, progressive=True, optimize=True)
+    elif output_format == 'png':
+        return willow.save_as_png(output)
+    elif output_format == 'gif':
+        return willow.save_as_gif(output)
+
+
+def encode_webp(source):
+    # The bytes of `source`, a Pillow image, saved as WebP
+    if source.mode not in ('RGB', 'RGBA'):
+        if PillowImage(source).has_alpha():
+            source = source.convert('RGBA')
+        else:
+            source = source.convert('RGB')
+    output = BytesIO()
+    source.save(output, 'WEBP', quality=WEBP_QUALITY)
+    return output.getvalue()
+
+
+def webp_enabled():
+    # Whether to make WebP renditions, which Pillow needs libwebp for
+    PIL.Image.init()
+    return getattr(settings, 'RENDITIONS_WEBP', False) and 'WEBP' in PIL.Image.SAVE
+
+
+def get_webp_name(rendition):
+    return os.path.splitext(rendition.file.name)[0] + '.webp'
+
+
+def get_webp_exists_key(rendition):
+    return 'collidersite:webp-exists:{}'.format(rendition.id)
+
+
+def get_webp(rendition):
+    """
+    Return the storage name of the WebP version of `rendition`, making it
+    out of the rendition's file if it doesn't exist yet.
+    """
+    storage = rendition.file.storage
+    name = get_webp_name(rendition)
+    if not storage.exists(name):
+        with rendition.file.open('rb') as f:
+            webp = encode_webp(PIL.Image.open(f))
+        name = storage.save(name, ContentFile(webp))
+    cache.set(get_webp_exists_key(rendition), True, WEBP_EXISTS_TIMEOUT)
+    return name
+
+
+def get_webp_url(rendition, generate=False):
+    """
+    Return the storage URL of the WebP version of `rendition`, or None if
+    it doesn't exist and `generate` is false. Whether it exists is kept in
+    the cache, as asking remote storage would cost a request per image.
+    """
+    storage = rendition.file.storage
+    key = get_webp_exists_key(rendition)
+    exists = cache.get(key)
+    if exists is None:
+        exists = storage.exists(get_webp_name(rendition))
+        cache.set(key, exists, WEBP_EXISTS_TIMEOUT if exists else WEBP_MISSING_TIMEOUT)
+    if exists:
+        return storage.url(get_webp_name(rendition))
+    if generate:
+        return storage.url(get_webp(rendition))
+    return None
+
+
+def get_orientation(source):
+    # The EXIF orientation of a JPEG, 1 if it has none
+    try:
+        exif = source._getexif()
+    except Exception:
+        exif = None
+    orientation = exif.get(EXIF_ORIENTATION, 1) if exif else 1
+    return orientation if orientation in ORIENTATION_TRANSPOSES else 1
+
+
+def render(image, filters, webp=False):
+    """
+    Run `filters` on `image`, decoding its file once for all of them.
+    Returns a dict of filter spec to the rendition as a Willow image file;
+    see Rendering.run for `webp`.
+    """
+    fallback = []
+    outputs = {}
+    with image.get_willow_image() as willow_file:
+        original_format = willow_file.format_name
+        willow_file.f.seek(0)
+        source = PIL.Image.open(willow_file.f)
+        orientation = get_orientation(source)
+        size = source.size
+        if orientation >= 5:
+            # Rotated by 90 degrees
+            size = size[::-1]
+
+        renderings = []
+        for image_filter in filters:
+            try:
+                renderings.append(Rendering(image_filter, image, size))
+            except AttributeError:
+                # An operation that does more than crop and resize
+                fallback.append(image_filter)
+        renderings.sort(key=lambda rendering: rendering.source_size, reverse=True)
+
+        if renderings:
+            # JPEGs are decoded at the smallest scale the largest rendition
+            # allows; other formats ignore this
+            draft_size = renderings[0].source_size
+            if orientation >= 5:
+                draft_size = draft_size[::-1]
+            source.draft(source.mode, draft_size)
+            source.load()
+            for transpose in ORIENTATION_TRANSPOSES.get(orientation, ()):
+                source = source.transpose(transpose)
+
+        for rendering in renderings:
+            if rendering.source_size[0] * OVERSAMPLING <= source.size[0]:
+                # Much smaller than the current copy, and than the ones that
+                # were made before; the next ones are made out of this one
+                source = PillowImage(source).resize(rendering.source_size).image
+            outputs[rendering.filter.spec] = rendering.run(
+                source, size, original_format, webp)
+
+    for image_filter in fallback:
+        outputs[image_filter.spec] = Filter.run(image_filter, image, BytesIO())
+        outputs[image_filter.spec].webp = None
+    return outputs
+
+
+def make_placeholder(image):
+    """
+    Return the average colour of `image` as '#rrggbb' and a PLACEHOLDER_SIZE
+    pixel version of it as a data URI.
+    """
+    with image.get_willow_image() as willow_file:
+        willow_file.f.seek(0)
+        source = PIL.Image.open(willow_file.f)
+        orientation = get_orientation(source)
+        source.draft('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        source = source.convert('RGB')
+
+    for transpose in ORIENTATION_TRANSPOSES.get(orientation, ()):
+        source = source.transpose(transpose)
+    source.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), PIL.Image.ANTIALIAS)
+    color = '#{:02x}{:02x}{:02x}'.format(
+        *source.resize((1, 1), PIL.Image.ANTIALIAS).getpixel((0, 0)))
+
+    output = BytesIO()
+    source.save(output, 'JPEG', quality=50)
+    data_uri = 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+    return color, data_uri
+
+
+class FastFilter(Filter):
+    """
+    A Filter that makes its rendition with render(). Pass it to
+    Image.get_rendition instead of a filter spec.
+    """
+    def run(self, image, output):
+        return render(image, [self])[self.spec]
+
+
+def get_rendition_filename(image, image_filter, format_name):
+    # The file name Image.get_rendition gives a rendition
+    input_filename = os.path.basename(image.file.name)
+    input_filename_without_extension = os.path.splitext(input_filename)[0]
+
+    output_extension = image_filter.spec.replace('|', '.') + FORMAT_EXTENSIONS[format_name]
+    cache_key = image_filter.get_cache_key(image)
+    if cache_key:
+        output_extension = cache_key + '.' + output_extension
+
+    # Truncate filename to prevent it going over 60 chars
+    output_filename_without_extension = input_filename_without_extension[:(59 - len(output_extension))]
+    return output_filename_without_extension + '.' + output_extension
+
+
+def create_renditions(image, filter_specs):
+    """
+    Return a dict of filter spec to the rendition of `image`, for each of
+    `filter_specs`, generating the ones that don't exist yet together, and
+    their WebP versions with RENDITIONS_WEBP.
+    """
+    filters = dict((spec, FastFilter(spec=spec)) for spec in filter_specs)
+    cache_keys = dict(
+        (spec, image_filter.get_cache_key(image)) for spec, image_filter in filters.items())
+
+    renditions = {}
+    for rendition in image.renditions.filter(filter_spec__in=filters):
+        if rendition.focal_point_key == cache_keys[rendition.filter_spec]:
+            renditions[rendition.filter_spec] = rendition
+
+    missing = [image_filter for spec, image_filter in filters.items() if spec not in renditions]
+    if not missing:
+        # Spares opening and decoding the source file
+        return renditions
+    for spec, generated_image in render(image, missing, webp_enabled()).items():
+        image_filter = filters[spec]
+        renditions[spec], created = image.renditions.get_or_create(
+            filter_spec=spec,
+            focal_point_key=cache_keys[spec],
+            defaults={'file': File(generated_image.f, name=get_rendition_filename(
+                image, image_filter, generated_image.format_name))},
+        )
+        if created and generated_image.webp is not None:
+            renditions[spec].file.storage.save(
+                get_webp_name(renditions[spec]), ContentFile(generated_image.webp))
+    return renditions
@@ -0,0 +1,152 @@
+"""
+Bulk loading of images and renditions for listings.
+
+Image.get_rendition looks up each rendition with its own query, even when
+the image's renditions have been prefetched, so a listing of n cards costs n
+rendition queries. prefetch_renditions loads the existing renditions of a
+whole listing in one query and keeps them on the images, where get_rendition
+below and the {% image %} tag of base/templatetags/image_tags.py find them.
+Renditions that don't exist yet are still generated on first use, with the
+FastFilter of base/image_filters.py.
+
+With RENDITIONS_LAZY_URLS, a rendition that doesn't exist yet isn't
+generated while rendering the page at all. The page links to the
+serve_rendition view in base/views.py instead, which generates it when the
+browser asks for it; LazyRendition provides the URL and the size the
+rendition is going to have.
+"""
+import hashlib
+
+from django.urls import reverse
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.models import AbstractRendition, Filter
+from wagtail.wagtailimages.shortcuts import get_rendition_or_not_found
+from wagtail.wagtailimages.views.serve import generate_signature
+
+from collidersite.base.image_filters import FastFilter, RenditionSize
+
+
+def prefetch_renditions(images, *filter_specs):
+    """
+    Load the existing renditions of `filter_specs` for every image in
+    `images` (None entries are skipped) with a single query.
+    """
+    images = dict((image.id, image) for image in images if image is not None)
+    if not images or not filter_specs:
+        return
+
+    filters = dict((spec, Filter(spec=spec)) for spec in filter_specs)
+    for image in images.values():
+        if not hasattr(image, 'prefetched_renditions'):
+            image.prefetched_renditions = {}
+
+    Rendition = get_image_model().get_rendition_model()
+    for rendition in Rendition.objects.filter(
+            image_id__in=images, filter_spec__in=filters):
+        image = images[rendition.image_id]
+        # Renditions made before the focal point moved are left alone
+        if rendition.focal_point_key == filters[rendition.filter_spec].get_cache_key(image):
+            # Saves a query for the alt text
+            rendition.image = image
+            image.prefetched_renditions[rendition.filter_spec] = rendition
+
+
+def prefetch_images(objects, *filter_specs, **kwargs):
+    """
+    Load the images that `objects` refer to through their `field_name`
+    foreign key ('image' by default) with a single query, and prefetch
+    their renditions of `filter_specs`. Useful for listings of pages of
+    different types, which can't use select_related.
+    """
+    field_name = kwargs.pop('field_name', 'image')
+    objects = [obj for obj in objects if getattr(obj, field_name + '_id', None)]
+    images = get_image_model().objects.in_bulk(
+        set(getattr(obj, field_name + '_id') for obj in objects))
+    for obj in objects:
+        image = images.get(getattr(obj, field_name + '_id'))
+        if image is not None:
+            setattr(obj, field_name, image)
+    prefetch_renditions(images.values(), *filter_specs)
+
+
+def get_rendition(image, image_filter, generate=True):
+    """
+    Return the rendition of `image` for `image_filter` (a Filter or filter
+    spec), from the prefetched renditions if it is there. Otherwise it is
+    looked up or, if `generate` is true, generated as usual, and kept for
+    the next time. Returns None if it doesn't exist and can't be generated.
+    """
+    if not isinstance(image_filter, Filter):
+        image_filter = Filter(spec=image_filter)
+    prefetched = getattr(image, 'prefetched_renditions', None)
+    if prefetched is None:
+        prefetched = image.prefetched_renditions = {}
+    if image_filter.spec not in prefetched:
+        if generate:
+            rendition = get_rendition_or_not_found(
+                image, FastFilter(spec=image_filter.spec))
+        else:
+            rendition = image.renditions.filter(
+                filter_spec=image_filter.spec,
+                focal_point_key=image_filter.get_cache_key(image),
+            ).first()
+            if rendition is None:
+                return None
+        prefetched[image_filter.spec] = rendition
+    return prefetched[image_filter.spec]
+
+
+def get_original_rendition(image):
+    """
+    Return an unsaved rendition that shows the original image file, for use
+    while the proper rendition is still being generated.
+    """
+    rendition = image.renditions.model(
+        image=image, width=image.width, height=image.height)
+    rendition.file.name = image.file.name
+    return rendition
+
+
+def estimate_rendition_size(image, image_filter):
+    """
+    Return the (width, height) that the rendition of `image_filter` of
+    `image` will have.
+    """
+    size = RenditionSize(image.width, image.height)
+    env = {}
+    for operation in image_filter.operations:
+        size = operation.run(size, image, env) or size
+    return size.get_size()
+
+
+def get_rendition_url(image, image_filter, output_format=None):
+    """
+    Return the URL of the serve_rendition view for a rendition, or for its
+    WebP version with `output_format='webp'`. It changes when the image
+    file or focal point does, so browsers can cache it for good.
+    """
+    signature = generate_signature(image.id, image_filter.spec).decode('ascii')
+    version = '{}:{}'.format(image.file.name, image_filter.get_cache_key(image))
+    view_name = 'serve_rendition_webp' if output_format == 'webp' else 'serve_rendition'
+    return reverse(view_name, args=(
+        signature, image.id, image_filter.spec,
+        hashlib.sha1(version.encode('utf-8')).hexdigest()[:8]))
+
+
+class LazyRendition(object):
+    """
+    A rendition that may not have been generated yet, with the attributes
+    of a Rendition that templates use. Its URL generates it on first use.
+    """
+    def __init__(self, image, image_filter):
+        self.image = image
+        self.filter_spec = image_filter.spec
+        self.width, self.height = estimate_rendition_size(image, image_filter)
+        self.url = get_rendition_url(image, image_filter)
+
+    alt = AbstractRendition.alt
+    attrs = AbstractRendition.attrs
+    attrs_dict = AbstractRendition.attrs_dict
+    img_tag = AbstractRendition.img_tag
+    __html__ = AbstractRendition.__html__
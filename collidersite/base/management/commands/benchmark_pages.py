@@ -0,0 +1,165 @@
+import json
+import random
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpRequest
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch
+from django.utils.http import urlencode
+
+from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin
+from wagtail.wagtailcore.models import Page, Site
+
+
+def percentile(values, percent):
+    # Nearest-rank percentile of a non-empty list
+    values = sorted(values)
+    index = max(0, int(round(percent / 100.0 * len(values))) - 1)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render sample pages of every page type of the default site, plus "
+        "paginated listings, the last page of blog indexes and tag "
+        "archives, through the Django test client and report p50/p95 "
+        "latency, queries and peak memory per page type. Use --output to "
+        "save the results as a baseline and --baseline to compare a later "
+        "run against it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--samples', type=int, default=5,
+            help="Pages of each page type to render")
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help="Timed requests per URL")
+        parser.add_argument(
+            '--warmup', type=int, default=1,
+            help="Untimed requests per URL (at least one), to fill the "
+                 "menu, breadcrumb and footer caches")
+        parser.add_argument(
+            '--page-cache', action='store_true',
+            help="Leave the full-page cache on; by default every request "
+                 "renders the page")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="JSON file of an earlier run")
+
+    def handle(self, **options):
+        if not options['page_cache']:
+            settings.PAGE_CACHE_ENABLED = False
+        site = Site.objects.get(is_default_site=True)
+        client = Client(HTTP_HOST=site.hostname)
+        urls = self.get_urls(site, options['samples'], random.Random(options['seed']))
+
+        results = OrderedDict()
+        for label, label_urls in urls.items():
+            times = []
+            queries = []
+            peak_memory = 0
+            for url in label_urls:
+                status = client.get(url).status_code
+                if status != 200:
+                    self.stdout.write("Skipped {}: status {}".format(url, status))
+                    continue
+                for i in range(options['warmup'] - 1):
+                    client.get(url)
+                for i in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.time()
+                        client.get(url)
+                        times.append((time.time() - started) * 1000)
+                    queries.append(len(context.captured_queries))
+                # Tracing allocations slows requests down, so memory is
+                # measured on a separate, untimed request
+                tracemalloc.start()
+                client.get(url)
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            if not times:
+                continue
+            results[label] = {
+                'urls': len(times) // options['repeat'],
+                'p50_ms': round(percentile(times, 50), 1),
+                'p95_ms': round(percentile(times, 95), 1),
+                'avg_queries': round(sum(queries) / float(len(queries)), 1),
+                'max_queries': max(queries),
+                'peak_memory_kb': peak_memory // 1024,
+            }
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        self.report(results, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def get_urls(self, site, samples, rng):
+        """
+        Return the URLs to render, grouped under the page type labels used
+        by base/metrics.py.
+        """
+        urls = OrderedDict()
+        pages = Page.objects.live().descendant_of(site.root_page, inclusive=True)
+        content_types = ContentType.objects.filter(
+            id__in=pages.values('content_type')).order_by('model')
+        for content_type in content_types:
+            ids = list(pages.filter(
+                content_type=content_type).order_by('path').values_list('id', flat=True))
+            ids = sorted(rng.sample(ids, min(samples, len(ids))))
+            for page in Page.objects.filter(id__in=ids).specific():
+                label = type(page).__name__
+                url = page.relative_url(site)
+                urls.setdefault(label, []).append(url)
+
+                # The last page of paginated listings (see export_static_site)
+                param = getattr(page, 'paginate_param', None)
+                if param is not None:
+                    num_pages = page.paginate(HttpRequest()).paginator.num_pages
+                    if num_pages > 1:
+                        urls.setdefault('{}?{}'.format(label, param), []).append(
+                            '{}?{}={}'.format(url, param, num_pages))
+
+                # The last page of the blog index, reached through the
+                # cursors of its next page links
+                if hasattr(page, 'get_page_cursors'):
+                    cursors = page.get_page_cursors()
+                    if cursors:
+                        urls.setdefault(label + '?after', []).append(
+                            '{}?{}'.format(url, urlencode({'after': cursors[-1]})))
+
+                if isinstance(page, RoutablePageMixin) and hasattr(page, 'get_child_tags'):
+                    for tag in page.get_child_tags()[:samples]:
+                        try:
+                            subpage = page.reverse_subpage('tag_archive', args=(tag.slug,))
+                        except NoReverseMatch:
+                            continue
+                        urls.setdefault(label + ':tag_archive', []).append(url + subpage)
+        return urls
+
+    def report(self, results, baseline):
+        columns = ('p50_ms', 'p95_ms', 'avg_queries', 'peak_memory_kb')
+        self.stdout.write('{:<36}{:>6}{:>16}{:>16}{:>16}{:>16}'.format(
+            'page type', 'urls', *columns))
+        for label, result in results.items():
+            cells = []
+            for column in columns:
+                cell = str(result[column])
+                if label in baseline:
+                    delta = result[column] - baseline[label][column]
+                    cell += ' ({:+.0f})'.format(delta)
+                cells.append(cell)
+            self.stdout.write('{:<36}{:>6}{:>16}{:>16}{:>16}{:>16}'.format(
+                label, result['urls'], *cells))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from collidersite.base.related import update_related_pages
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the related pages of every blog post, partner and industry "
+        "by the tags they share, as described in base/related.py. Publishing "
+        "a page updates the ones it affects in the background."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page', type=int, action='append', dest='page_ids',
+            help="Only update the related pages of the page with this id (repeatable)")
+
+    def handle(self, **options):
+        updated = update_related_pages(options['page_ids'])
+        self.stdout.write("Updated the related pages of {} pages".format(updated))
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Max
+from django.http import HttpRequest
+from django.test import Client
+from django.urls import NoReverseMatch
+from django.utils.http import urlencode
+
+from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin
+from wagtail.wagtailcore.models import Page, Site
+from wagtail.wagtailforms.models import AbstractForm
+from wagtail.wagtailimages.models import Image
+
+from collidersite.base.models import FooterText, GalleryPage, RelatedPage
+from collidersite.base.navigation import build_menu_tree
+from collidersite.base.templatetags.gallery_tags import GALLERY_PAGE_SIZE
+from collidersite.blog.models import BlogFeedEntry, BlogIndexPage
+from collidersite.people.coverage import COVERAGE_FIELDS, get_through_fields
+
+
+MANIFEST_NAME = '.export-manifest.json'
+
+# Test client of each worker process, set up by init_worker
+client = None
+
+
+def output_path(url, param=None, value=None):
+    """
+    Map a page URL to the file it is written to: /blog/ becomes
+    blog/index.html, and the URL with the query parameter `param` set to
+    `value`, such as page 2 of a paginated listing, becomes
+    blog/index-page-2.html. nginx can serve those with
+    `try_files $uri/index-page-$arg_page.html
+    $uri/index-gallery_page-$arg_gallery_page.html
+    $uri/index-after-$arg_after.html $uri/index.html`.
+    """
+    directory = url.strip('/')
+    if param is None:
+        filename = 'index.html'
+    else:
+        filename = 'index-{}-{}.html'.format(param, value)
+    return os.path.join(directory, filename)
+
+
+def init_worker(hostname):
+    global client
+    # Always render afresh; the export must not pick up stale cache entries
+    settings.PAGE_CACHE_ENABLED = False
+    # A static server can't generate renditions on request, so the pages
+    # must link to rendition files, generated while rendering if need be
+    settings.RENDITIONS_LAZY_URLS = False
+    settings.RENDITIONS_GENERATE_IN_REQUEST = True
+    client = Client(HTTP_HOST=hostname)
+
+
+def render(task):
+    """
+    Render one URL through the full request cycle and write it to disk.
+    Returns (url, reason) where reason is None on success.
+    """
+    url, path = task
+    response = client.get(url)
+    if response.status_code != 200:
+        return url, 'status {}'.format(response.status_code)
+    if settings.CSRF_COOKIE_NAME in response.cookies:
+        # The page has a form, which can only be submitted with a CSRF token
+        # issued by Django to the visitor
+        return url, 'contains a form'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    return url, None
+
+
+def sync_tree(source, destination):
+    # Copy files that are missing or have changed since the last export
+    copied = 0
+    for directory, dirnames, filenames in os.walk(source):
+        target_dir = os.path.join(
+            destination, os.path.relpath(directory, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            source_file = os.path.join(directory, filename)
+            target_file = os.path.join(target_dir, filename)
+            source_stat = os.stat(source_file)
+            if os.path.exists(target_file):
+                target_stat = os.stat(target_file)
+                if (target_stat.st_size == source_stat.st_size and
+                        target_stat.st_mtime >= source_stat.st_mtime):
+                    continue
+            shutil.copy2(source_file, target_file)
+            copied += 1
+    return copied
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every live page of the default site, including tag archive "
+        "routes and paginated listings, to static HTML files alongside the "
+        "collected static files and image renditions. Pages are only "
+        "re-rendered when they, their children, the people covering them, "
+        "their related pages, the menu or the footer changed since the last "
+        "export; use --full after editing snippets shown on pages. Pages "
+        "with forms are skipped and have to be served by Django."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output_dir', nargs='?',
+            default=os.path.join(settings.PROJECT_ROOT, 'static_site'))
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help="Number of processes rendering pages in parallel")
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Re-render every page, ignoring the previous export")
+
+    def handle(self, **options):
+        output_dir = options['output_dir']
+        site = Site.objects.get(is_default_site=True)
+
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = {}
+        if os.path.exists(manifest_path) and not options['full']:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        # Everything on the site shows the menu and the footer, so a change
+        # to either means every page has to be rendered again
+        site_state = json.dumps([
+            build_menu_tree(site.root_page),
+            FooterText.get_rendered_html(),
+        ], sort_keys=True)
+
+        targets = {}
+        for page in site.root_page.get_descendants(inclusive=True).live().specific():
+            if isinstance(page, AbstractForm):
+                continue
+            fingerprint = self.fingerprint(page, site_state)
+            for url, path in self.get_page_urls(page, site):
+                targets[url] = (os.path.join(output_dir, path), fingerprint)
+
+        tasks = [
+            (url, path) for url, (path, fingerprint) in sorted(targets.items())
+            if manifest.get(url) != fingerprint or not os.path.exists(path)
+        ]
+        self.stdout.write("Rendering {} of {} URLs with {} workers".format(
+            len(tasks), len(targets), options['workers']))
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        pool = multiprocessing.Pool(
+            options['workers'], initializer=init_worker,
+            initargs=(site.hostname,))
+        try:
+            for url, reason in pool.imap_unordered(render, tasks):
+                if reason is None:
+                    manifest[url] = targets[url][1]
+                else:
+                    manifest.pop(url, None)
+                    self.stdout.write("Skipped {}: {}".format(url, reason))
+        finally:
+            pool.close()
+            pool.join()
+
+        # Remove pages that were unpublished or deleted since the last export
+        for url in list(manifest):
+            if url not in targets:
+                path = os.path.join(output_dir, self.path_for_url(url))
+                if os.path.exists(path):
+                    os.remove(path)
+                del manifest[url]
+
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        call_command('collectstatic', interactive=False, verbosity=0)
+        copied = sync_tree(settings.STATIC_ROOT, os.path.join(
+            output_dir, settings.STATIC_URL.strip('/')))
+        if settings.MEDIA_URL.startswith('/'):
+            # Renditions on remote storage (S3) are already served directly
+            copied += sync_tree(
+                os.path.join(settings.MEDIA_ROOT, 'images'),
+                os.path.join(output_dir, settings.MEDIA_URL.strip('/'), 'images'))
+        self.stdout.write("Copied {} static and media files".format(copied))
+
+    def fingerprint(self, page, site_state):
+        # Index pages list their children, so their output changes whenever
+        # a descendant is published or unpublished
+        descendants = Page.objects.descendant_of(page).live().aggregate(
+            last_published_at=Max('last_published_at'), count=Count('id'))
+        state = json.dumps([
+            str(page.last_published_at),
+            str(descendants['last_published_at']),
+            descendants['count'],
+            site_state,
+        ] + self.get_linked_state(page), default=str)
+        return hashlib.sha1(state.encode('utf-8')).hexdigest()
+
+    def get_linked_state(self, page):
+        """
+        The state of what the page or its descendants show that is stored
+        outside of them, and so changes without them being published.
+        """
+        state = []
+        # The people covering locations, partners and industries, and their
+        # people_count on the index pages. A person's links only change when
+        # the person is published.
+        for field_name in COVERAGE_FIELDS:
+            through, person_field, page_field = get_through_fields(field_name)
+            state.append(sorted(through.objects.filter(**{
+                person_field + '__live': True,
+                page_field + '__path__startswith': page.path,
+            }).aggregate(
+                count=Count('id'),
+                last_published_at=Max(person_field + '__last_published_at'),
+            ).items()))
+        # Related pages, which are recomputed when other pages are published
+        state.append(list(RelatedPage.objects.filter(page=page).values_list(
+            'related_page_id', 'related_page__last_published_at')))
+        # The feed entries of blog posts, rendered when the posts are first
+        # listed in a feed
+        if isinstance(page, BlogIndexPage):
+            state.append(sorted(BlogFeedEntry.objects.filter(
+                page__path__startswith=page.path,
+            ).aggregate(count=Count('page_id'), updated=Max('updated')).items()))
+        # The images of a gallery, which are added to its collection
+        # without the page being published
+        if isinstance(page, GalleryPage):
+            state.append(sorted(Image.objects.filter(
+                collection_id=page.collection_id,
+            ).aggregate(count=Count('id'), last_id=Max('id')).items()))
+        return state
+
+    def get_page_urls(self, page, site):
+        url = page.relative_url(site)
+        yield url, output_path(url)
+
+        # Tag archives on BlogIndexPage, PartnersIndexPage and
+        # IndustriesIndexPage
+        if isinstance(page, RoutablePageMixin) and hasattr(page, 'get_child_tags'):
+            for tag in page.get_child_tags():
+                try:
+                    subpage = page.reverse_subpage(
+                        'tag_archive', args=(tag.slug,))
+                except NoReverseMatch:
+                    # The slug can't be routed to, so there's no page to save
+                    continue
+                yield url + subpage, output_path(url + subpage)
+                # tag.count is the number of pages the archive lists
+                num_pages = Paginator(
+                    range(tag.count), page.TAG_ARCHIVE_PER_PAGE).num_pages
+                for number in range(2, num_pages + 1):
+                    yield ('{}{}?page={}'.format(url, subpage, number),
+                           output_path(url + subpage, 'page', number))
+
+        # Paginated listings such as PartnersIndexPage, which name their
+        # query parameter; the first page is the page URL itself
+        param = getattr(page, 'paginate_param', None)
+        if param is not None:
+            num_pages = page.paginate(HttpRequest()).paginator.num_pages
+            for number in range(2, num_pages + 1):
+                yield ('{}?{}={}'.format(url, param, number),
+                       output_path(url, param, number))
+
+        # The pages of the blog index after the first, and the cards of each
+        # alone that its infinite scroll loads, both found by their cursor
+        if isinstance(page, BlogIndexPage):
+            fragment_url = url + page.reverse_subpage('posts')
+            for cursor in page.get_page_cursors():
+                query = '?' + urlencode({'after': cursor})
+                yield url + query, output_path(url, 'after', cursor)
+                yield fragment_url + query, output_path(fragment_url, 'after', cursor)
+
+        # Galleries, GALLERY_PAGE_SIZE images at a time
+        if isinstance(page, GalleryPage) and page.collection_id:
+            num_pages = Paginator(Image.objects.filter(
+                collection_id=page.collection_id), GALLERY_PAGE_SIZE).num_pages
+            for number in range(2, num_pages + 1):
+                yield ('{}?gallery_page={}'.format(url, number),
+                       output_path(url, 'gallery_page', number))
+
+    def path_for_url(self, url):
+        path, _, query = url.partition('?')
+        params = parse_qsl(query)
+        if not params:
+            return output_path(path)
+        return output_path(path, *params[0])
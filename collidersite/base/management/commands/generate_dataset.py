@@ -0,0 +1,265 @@
+import datetime
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from taggit.models import Tag
+
+from wagtail.wagtailcore.models import Site
+from wagtail.wagtailimages.models import Image
+
+from collidersite.base.related import update_related_pages
+from collidersite.blog.models import (
+    BlogIndexPage, BlogPage, BlogPageTag, BlogPeopleRelationship
+)
+from collidersite.industries.models import (
+    IndustriesIndexPage, IndustryPage, IndustryPageTag
+)
+from collidersite.locations.models import LocationPage, LocationsIndexPage
+from collidersite.partners.models import (
+    Country, PartnerPage, PartnerPageTag, PartnersIndexPage, PartnerType
+)
+from collidersite.people.coverage import update_people_counts
+from collidersite.people.models import PeopleIndexPage, Person
+
+
+WORDS = (
+    'innovation startup venture market growth digital platform energy '
+    'mobility health finance retail logistics data cloud network design '
+    'research product strategy partner industry capital scale launch '
+    'customer service sustainable smart city future team mentor program '
+    'accelerator corporate pilot solution technology global local region'
+).split()
+
+FIRST_NAMES = (
+    'Anna Ben Carla David Elena Farid Greta Hugo Ines Jonas Kira Luca Maya '
+    'Nils Olga Pavel Rosa Sami Tara Umar Vera Wim Yara Zeno'
+).split()
+
+LAST_NAMES = (
+    'Andersen Bakker Costa Dumont Eriksen Fischer Garcia Horvat Ivanova '
+    'Jansen Kowalski Laine Moreau Novak Olsen Petrov Rossi Schmidt Tanaka '
+    'Varga Weber Young Zielinski'
+).split()
+
+# Rows of through tables are inserted in batches of this size
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, reproducible site for benchmarking: people, "
+        "partners, industries, blog posts and locations with M2M links, "
+        "tags and StreamField bodies, added below the existing index pages "
+        "(or new ones). Only run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=20000)
+        parser.add_argument('--partners', type=int, default=2000)
+        parser.add_argument('--industries', type=int, default=500)
+        parser.add_argument('--blog-posts', type=int, default=5000)
+        parser.add_argument('--locations', type=int, default=300)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="Seed of the random generator; the same seed on the same "
+                 "initial data generates the same site")
+
+    def handle(self, **options):
+        self.random = random.Random(options['seed'])
+        # Keeps slugs unique among siblings when generating more data with
+        # another seed
+        self.slug_prefix = 'gen{}'.format(options['seed'])
+        self.images = list(Image.objects.order_by('id').values_list('id', flat=True))
+        root = Site.objects.get(is_default_site=True).root_page
+
+        tags = self.create_tags(options['tags'])
+
+        locations = self.create_pages(
+            self.get_index(root, LocationsIndexPage, 'Locations'),
+            options['locations'], self.build_location)
+
+        countries = list(Country.objects.all()) or [
+            Country.objects.create(title=title)
+            for title in ('Denmark', 'Germany', 'Spain', 'Japan', 'Canada')]
+        partner_types = list(PartnerType.objects.all()) or [
+            PartnerType.objects.create(title=title)
+            for title in ('Corporate', 'Investor', 'University')]
+        partners = self.create_pages(
+            self.get_index(root, PartnersIndexPage, 'Partners'),
+            options['partners'],
+            lambda i: self.build_partner(i, countries, partner_types))
+        self.tag_pages(PartnerPageTag, partners, tags)
+
+        industries = self.create_pages(
+            self.get_index(root, IndustriesIndexPage, 'Industries'),
+            options['industries'], self.build_industry)
+        self.tag_pages(IndustryPageTag, industries, tags)
+
+        people = self.create_pages(
+            self.get_index(root, PeopleIndexPage, 'People'),
+            options['people'], lambda i: self.build_person(i, locations))
+        self.link_people(people, 'covered_markets', locations, 3)
+        self.link_people(people, 'partners', partners, 2)
+        self.link_people(people, 'industries', industries, 2)
+
+        posts = self.create_pages(
+            self.get_index(root, BlogIndexPage, 'Blog'),
+            options['blog_posts'], self.build_blog_post)
+        self.tag_pages(BlogPageTag, posts, tags)
+        self.insert(BlogPeopleRelationship, [
+            BlogPeopleRelationship(page_id=post_id, people_id=person_id,
+                                   sort_order=order)
+            for post_id in posts
+            for order, person_id in enumerate(self.sample(people, 2))])
+
+        # The tags were inserted without publishing, so nothing has computed
+        # the related pages yet
+        update_related_pages()
+
+        self.stdout.write("Done.")
+
+    def get_index(self, root, model, title):
+        index = model.objects.live().descendant_of(root).first()
+        if index is None:
+            index = root.add_child(instance=model(
+                title=title, slug=slugify(title), live=True))
+        return index
+
+    def create_pages(self, parent, count, build):
+        """
+        Add `count` pages made by `build(i)` below `parent` and return their
+        ids. Pages go through add_child one at a time, as multi-table
+        inheritance and treebeard paths rule out bulk_create.
+        """
+        model = None
+        ids = []
+        now = timezone.now()
+        for start in range(0, count, BATCH_SIZE):
+            with transaction.atomic():
+                for i in range(start, min(start + BATCH_SIZE, count)):
+                    page = build(i)
+                    model = type(page)
+                    page.live = True
+                    page.first_published_at = page.last_published_at = (
+                        now - datetime.timedelta(minutes=i))
+                    parent.add_child(instance=page)
+                    ids.append(page.id)
+            self.stdout.write("{}: {} of {}".format(
+                model.__name__, len(ids), count))
+        return ids
+
+    def insert(self, model, objs):
+        for start in range(0, len(objs), BATCH_SIZE):
+            model.objects.bulk_create(objs[start:start + BATCH_SIZE])
+        self.stdout.write("{}: {} rows".format(model.__name__, len(objs)))
+
+    def sample(self, population, max_size):
+        size = self.random.randint(0, min(max_size, len(population)))
+        return self.random.sample(population, size)
+
+    def create_tags(self, count):
+        # Both the names and the slugs of tags are unique
+        existing = set(Tag.objects.values_list('name', flat=True))
+        existing.update(Tag.objects.values_list('slug', flat=True))
+        tags = []
+        while len(tags) < count:
+            words = '{} {}'.format(*self.random.sample(WORDS, 2))
+            name, suffix = words, len(tags)
+            while name in existing or slugify(name) in existing:
+                # There are only so many pairs of words
+                name = '{} {}'.format(words, suffix)
+                suffix += 1
+            slug = slugify(name)
+            existing.update((name, slug))
+            tags.append(Tag(name=name, slug=slug))
+        Tag.objects.bulk_create(tags)
+        return list(Tag.objects.filter(
+            slug__in=[tag.slug for tag in tags]
+        ).order_by('id').values_list('id', flat=True))
+
+    def tag_pages(self, through, page_ids, tag_ids):
+        self.insert(through, [
+            through(content_object_id=page_id, tag_id=tag_id)
+            for page_id in page_ids for tag_id in self.sample(tag_ids, 4)])
+
+    def link_people(self, people, field_name, targets, max_links):
+        field = Person._meta.get_field(field_name)
+        through = field.remote_field.through
+        person_column = field.m2m_field_name() + '_id'
+        target_column = field.m2m_reverse_field_name() + '_id'
+        self.insert(through, [
+            through(**{person_column: person_id, target_column: target_id})
+            for person_id in people
+            for target_id in self.sample(targets, max_links)])
+        # bulk_create bypasses the m2m_changed receivers
+        update_people_counts(field_name, targets)
+
+    def slug(self, kind, i):
+        return '{}-{}-{}'.format(self.slug_prefix, kind, i)
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for i in range(count))
+
+    def image(self):
+        if self.images:
+            return self.random.choice(self.images)
+        return None
+
+    def body(self):
+        blocks = []
+        for i in range(self.random.randint(2, 6)):
+            blocks.append({'type': 'heading_block', 'value': {
+                'heading_text': self.words(4).capitalize(), 'size': 'h2'}})
+            blocks.append({'type': 'paragraph_block', 'value': '<p>{}.</p>'.format(
+                self.words(self.random.randint(40, 120)).capitalize())})
+        return json.dumps(blocks)
+
+    def build_location(self, i):
+        city = self.words(1).capitalize() + 'ville'
+        return LocationPage(
+            title='{} {}'.format(city, i), slug=self.slug('location', i),
+            introduction=self.words(20), image_id=self.image(),
+            body=self.body(), country=self.words(1).capitalize(), city=city,
+            lat_long='{:.6f}, {:.6f}'.format(
+                self.random.uniform(-80, 80), self.random.uniform(-180, 180)))
+
+    def build_partner(self, i, countries, partner_types):
+        return PartnerPage(
+            title='{} {}'.format(self.words(2).title(), i),
+            slug=self.slug('partner', i), introduction=self.words(20),
+            image_id=self.image(), body=self.body(),
+            origin=self.random.choice(countries),
+            partner_type=self.random.choice(partner_types))
+
+    def build_industry(self, i):
+        return IndustryPage(
+            title='{} {}'.format(self.words(2).title(), i),
+            slug=self.slug('industry', i), introduction=self.words(20),
+            image_id=self.image(), body=self.body())
+
+    def build_person(self, i, locations):
+        first_name = self.random.choice(FIRST_NAMES)
+        last_name = self.random.choice(LAST_NAMES)
+        return Person(
+            title='{} {}'.format(first_name, last_name),
+            slug=self.slug('person', i), first_name=first_name,
+            last_name=last_name, job_title=self.words(2).title(),
+            person_type=self.random.choice(Person.PERSON_TYPE_CHOICES)[0],
+            image_id=self.image(), location_id=self.random.choice(locations),
+            intro_subtitle=self.words(6), intro_paragraph=self.words(40),
+            main_paragraph=self.words(80))
+
+    def build_blog_post(self, i):
+        return BlogPage(
+            title='{} {}'.format(self.words(5).capitalize(), i),
+            slug=self.slug('post', i), subtitle=self.words(8),
+            introduction=self.words(30), image_id=self.image(),
+            body=self.body(),
+            date_published=datetime.date(2018, 1, 1) + datetime.timedelta(
+                days=self.random.randint(0, 1000)))
@@ -0,0 +1,43 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.models import SourceImageIOError
+
+from collidersite.base.models import ImagePlaceholder
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the placeholders shown while images load for the images that "
+        "don't have one yet, or were replaced since. New uploads get theirs "
+        "in the background."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Check every image, not only those without a placeholder")
+
+    def handle(self, **options):
+        images = get_image_model().objects.order_by('id')
+        if not options['all']:
+            images = images.filter(placeholder__isnull=True)
+
+        checked = failed = 0
+        for image in images.iterator():
+            try:
+                ImagePlaceholder.update_for(image)
+            except SourceImageIOError:
+                logger.warning("Image %s has no source file", image.id)
+                failed += 1
+            except Exception:
+                logger.exception("Placeholder of image %s failed", image.id)
+                failed += 1
+            else:
+                checked += 1
+        self.stdout.write("Checked {} placeholders, {} failed".format(checked, failed))
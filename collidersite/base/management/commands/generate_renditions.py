@@ -0,0 +1,42 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from collidersite.base.renditions import (
+    IMAGE_USAGES, generate_in_parallel, get_missing_renditions,
+    get_required_renditions
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the missing image renditions used by the templates, as "
+        "listed in base/renditions.py, with a pool of worker processes. See "
+        "sync_renditions to also delete the unused ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help="Number of processes generating renditions in parallel")
+        parser.add_argument(
+            '--usage', action='append', dest='usages',
+            choices=[usage.name for usage in IMAGE_USAGES],
+            help="Only generate renditions of this usage (repeatable)")
+        parser.add_argument(
+            '--image', type=int, action='append', dest='image_ids',
+            help="Only generate renditions of the image with this id (repeatable)")
+
+    def handle(self, **options):
+        usages = None
+        if options['usages']:
+            usages = [usage for usage in IMAGE_USAGES if usage.name in options['usages']]
+        required = get_required_renditions(options['image_ids'], usages)
+        missing = get_missing_renditions(required)
+        self.stdout.write("{} renditions of {} images are missing".format(
+            sum(len(specs) for specs in missing.values()), len(missing)))
+        if not missing:
+            return
+
+        generated, failed = generate_in_parallel(missing, options['workers'])
+        self.stdout.write("Generated {} renditions, {} failed".format(generated, failed))
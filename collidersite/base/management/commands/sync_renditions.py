@@ -0,0 +1,68 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from wagtail.wagtailimages import get_image_model
+
+from collidersite.base.renditions import (
+    generate_in_parallel, get_protected_filter_specs, get_required_keys,
+    get_required_renditions, group_keys
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the image renditions in line with what the templates use, as "
+        "listed in base/renditions.py: generate the missing ones with a pool "
+        "of worker processes, then delete those nothing uses anymore, files "
+        "included. Run after deploying instead of deleting every rendition, "
+        "so that visitors never wait for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help="Number of processes generating renditions in parallel")
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of unused renditions deleted per transaction")
+        parser.add_argument(
+            '--keep-unused', action='store_true',
+            help="Only generate the missing renditions")
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report what would be generated and deleted")
+
+    def handle(self, **options):
+        Rendition = get_image_model().get_rendition_model()
+        required = get_required_keys(get_required_renditions())
+
+        existing = dict(
+            ((image_id, spec, focal_point_key), rendition_id)
+            for rendition_id, image_id, spec, focal_point_key in Rendition.objects.values_list(
+                'id', 'image_id', 'filter_spec', 'focal_point_key').iterator()
+        )
+        missing = group_keys(required.difference(existing))
+        protected = get_protected_filter_specs()
+        unused = sorted(
+            rendition_id for key, rendition_id in existing.items()
+            if key not in required and key[1] not in protected)
+
+        self.stdout.write("{} renditions of {} images are missing, {} are unused".format(
+            sum(len(specs) for specs in missing.values()), len(missing), len(unused)))
+        if options['dry_run']:
+            return
+
+        if missing:
+            generated, failed = generate_in_parallel(missing, options['workers'])
+            self.stdout.write("Generated {} renditions, {} failed".format(generated, failed))
+
+        if unused and not options['keep_unused']:
+            batch_size = options['batch_size']
+            for start in range(0, len(unused), batch_size):
+                # Wagtail deletes the files (and base/signals.py their WebP
+                # versions) once each batch is committed
+                with transaction.atomic():
+                    Rendition.objects.filter(id__in=unused[start:start + batch_size]).delete()
+            self.stdout.write("Deleted {} unused renditions".format(len(unused)))
@@ -0,0 +1,188 @@
+"""
+Per-request instrumentation, recorded by RequestMetricsMiddleware.
+
+Every request is labelled with the class of the Wagtail page it served
+(e.g. "BlogIndexPage"), plus the route for routable pages
+("BlogIndexPage:tag_archive"), or with the URL name of any other view. Its
+query count, SQL time, template render time and cache hits are added to
+per-label totals, which each process buffers for METRICS_FLUSH_INTERVAL
+seconds before adding them to counters in the default cache, so that the
+metrics view sees the totals of all processes.
+
+Requests that go over the query or time budget of their page type in
+PAGE_BUDGETS are logged as warnings and counted.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'collidersite:metrics'
+LABELS_KEY = KEY_PREFIX + ':labels'
+
+# Times are summed as whole microseconds, as cache counters are integers
+FIELDS = (
+    'requests', 'queries', 'sql_time', 'render_time', 'total_time',
+    'cache_hits', 'cache_misses', 'over_budget',
+)
+
+_local = threading.local()
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.time()
+
+
+def get_label(request):
+    # Page cache hits are served before the URL is resolved, with the label
+    # the page was stored under
+    label = getattr(request, 'metrics_label', None)
+    if label is not None:
+        return label
+    page = getattr(request, 'served_page', None)
+    if page is not None:
+        label = type(page).__name__
+        route = getattr(request, 'served_route', None)
+        if route is not None and route != 'index_route':
+            label += ':' + route
+        return label
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.view_name:
+        return match.view_name
+    return 'unresolved'
+
+
+def start_request():
+    _local.cache_hits = 0
+    _local.cache_misses = 0
+    _local.active = True
+
+
+def finish_request():
+    _local.active = False
+    return _local.cache_hits, _local.cache_misses
+
+
+def record_cache(hits=0, misses=0):
+    """
+    Count cache lookups made by the current request. Lookups outside a
+    request, e.g. in management commands or background tasks, are ignored.
+    """
+    if getattr(_local, 'active', False):
+        _local.cache_hits += hits
+        _local.cache_misses += misses
+
+
+def get_budget(request, label):
+    budgets = getattr(settings, 'PAGE_BUDGETS', {})
+    page = getattr(request, 'served_page', None)
+    if label in budgets:
+        return budgets[label]
+    if page is not None and type(page).__name__ in budgets:
+        return budgets[type(page).__name__]
+    return budgets.get('default')
+
+
+def record(request, sample):
+    """
+    Add the measurements of one request to the totals of its label. `sample`
+    has a value for every field in FIELDS except 'requests' and
+    'over_budget', with times in seconds.
+    """
+    global _last_flush
+    label = get_label(request)
+
+    over_budget = False
+    budget = get_budget(request, label)
+    if budget is not None:
+        if sample['queries'] > budget.get('queries', float('inf')):
+            over_budget = True
+        if sample['total_time'] * 1000 > budget.get('time', float('inf')):
+            over_budget = True
+    if over_budget:
+        logger.warning(
+            "%s over budget (%s): %d queries, %.1fms SQL, %.1fms render, "
+            "%.1fms total for %s",
+            label, budget, sample['queries'], sample['sql_time'] * 1000,
+            sample['render_time'] * 1000, sample['total_time'] * 1000,
+            request.get_full_path())
+
+    with _pending_lock:
+        totals = _pending.setdefault(label, dict.fromkeys(FIELDS, 0))
+        totals['requests'] += 1
+        totals['over_budget'] += int(over_budget)
+        for field in ('queries', 'cache_hits', 'cache_misses'):
+            totals[field] += sample[field]
+        for field in ('sql_time', 'render_time', 'total_time'):
+            totals[field] += int(sample[field] * 1000000)
+        due = time.time() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+        if due:
+            _last_flush = time.time()
+    if due:
+        flush()
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            # Another process created the counter first
+            cache.incr(key, delta)
+
+
+def flush():
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return
+
+    labels = cache.get(LABELS_KEY) or []
+    new_labels = [label for label in pending if label not in labels]
+    if new_labels:
+        cache.set(LABELS_KEY, labels + new_labels, None)
+
+    for label, totals in pending.items():
+        for field, value in totals.items():
+            if value:
+                _incr('{}:{}:{}'.format(KEY_PREFIX, label, field), value)
+
+
+def get_totals():
+    """
+    Return the totals and averages of every label recorded so far, the most
+    requested first.
+    """
+    labels = cache.get(LABELS_KEY) or []
+    keys = dict(
+        ((label, field), '{}:{}:{}'.format(KEY_PREFIX, label, field))
+        for label in labels for field in FIELDS)
+    values = cache.get_many(keys.values())
+
+    results = []
+    for label in labels:
+        totals = dict(
+            (field, values.get(keys[label, field], 0)) for field in FIELDS)
+        requests = totals['requests']
+        if not requests:
+            continue
+        lookups = totals['cache_hits'] + totals['cache_misses']
+        results.append({
+            'label': label,
+            'requests': requests,
+            'over_budget': totals['over_budget'],
+            'avg_queries': round(totals['queries'] / requests, 1),
+            'avg_sql_ms': round(totals['sql_time'] / requests / 1000, 1),
+            'avg_render_ms': round(totals['render_time'] / requests / 1000, 1),
+            'avg_total_ms': round(totals['total_time'] / requests / 1000, 1),
+            'cache_hit_ratio': (
+                round(totals['cache_hits'] / lookups, 3) if lookups else None),
+        })
+    return sorted(results, key=lambda result: -result['requests'])
+
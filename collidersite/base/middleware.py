@@ -0,0 +1,91 @@
+import itertools
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from collidersite.base import metrics, page_cache
+
+
+class PageCacheMiddleware(object):
+    """
+    Serves Wagtail pages to anonymous visitors from the page cache in
+    base/page_cache.py, storing freshly rendered pages on a miss and
+    queueing a background re-render when serving a stale one. It needs
+    request.user, request.session and request.site, so it has to come after
+    the authentication, message and Wagtail site middleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = page_cache.get_cache_key(request)
+        if key is None:
+            return self.get_response(request)
+
+        revalidating = getattr(request, 'page_cache_revalidate', False)
+        if not revalidating:
+            entry, is_fresh = page_cache.get_entry(key)
+            if entry is not None:
+                request.metrics_label = entry.get('metrics_label')
+                if not is_fresh:
+                    page_cache.schedule_revalidation(key, request)
+                return page_cache.build_response(request, entry, is_fresh)
+
+        response = self.get_response(request)
+        if page_cache.is_cacheable(request, response):
+            page_cache.store(key, request, response)
+            response['X-Page-Cache'] = 'MISS'
+        elif revalidating:
+            # The page has been unpublished, made private, etc. since it was
+            # cached, so the stale copy must not be served any longer
+            page_cache.delete(key)
+        return response
+
+
+class RequestMetricsMiddleware(object):
+    """
+    Records the query count, SQL time, template render time and cache hits
+    of every request with base/metrics.py. It has to come first so that the
+    timings include all other middleware, the page cache in particular.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            return self.get_response(request)
+
+        # Django 1.11 can only count queries by logging them, as it does
+        # when DEBUG is on
+        force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        first_query = len(connection.queries_log)
+        metrics.start_request()
+        started = time.time()
+        try:
+            response = self.get_response(request)
+        finally:
+            total_time = time.time() - started
+            cache_hits, cache_misses = metrics.finish_request()
+            connection.force_debug_cursor = force_debug_cursor
+
+        queries = list(itertools.islice(
+            connection.queries_log, first_query, None))
+        metrics.record(request, {
+            'queries': len(queries),
+            'sql_time': sum(float(query['time']) for query in queries),
+            'render_time': getattr(request, 'metrics_render_time', 0),
+            'total_time': total_time,
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
+        })
+        return response
+
+    def process_template_response(self, request, response):
+        started = time.time()
+
+        def rendered(response):
+            request.metrics_render_time = time.time() - started
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.5 on 2026-10-18 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailimages', '0019_delete_filter'),
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagePlaceholder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(editable=False, max_length=255)),
+                ('color', models.CharField(max_length=7)),
+                ('data_uri', models.TextField()),
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='placeholder', to='wagtailimages.Image')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.5 on 2026-10-18 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+        ('base', '0002_imageplaceholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_pages', to='wagtailcore.Page')),
+                ('related_page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Page')),
+            ],
+            options={
+                'ordering': ['page', '-score'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedpage',
+            unique_together=set([('page', 'related_page')]),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
 
+from django.core.cache import cache
 from django.db import models
+from django.utils.safestring import mark_safe
 
 from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
@@ -15,12 +17,17 @@ from wagtail.wagtailadmin.edit_handlers import (
 )
 from wagtail.wagtailcore.fields import RichTextField, StreamField
 from wagtail.wagtailcore.models import Collection, Page
+from wagtail.wagtailcore.templatetags.wagtailcore_tags import richtext
 from wagtail.wagtailforms.models import AbstractEmailForm, AbstractFormField
+from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.edit_handlers import ImageChooserPanel
 from wagtail.wagtailsearch import index
 from wagtail.wagtailsnippets.models import register_snippet
 
 from .blocks import BaseStreamBlock
+from .cache import PAGE_TREE_CACHE_TIMEOUT, get_or_build, get_page_tree_version
+from .image_filters import make_placeholder
+from .images import prefetch_images
 
 
 @register_snippet
@@ -40,10 +47,107 @@ class FooterText(models.Model):
     def __str__(self):
         return "Footer text"
 
+    @staticmethod
+    def cache_key():
+        # Page links in the rich text are expanded to URLs, so the rendered
+        # footer is tied to the page tree version as well
+        return 'collidersite:footer-text:{}'.format(get_page_tree_version())
+
+    @classmethod
+    def get_rendered_html(cls):
+        """
+        Returns the footer text rendered to its final HTML, as the `richtext`
+        filter would. It is rendered once and kept in the cache until the
+        footer text or the page tree changes.
+        """
+        def render():
+            footer_text = cls.objects.first()
+            return richtext(footer_text.body) if footer_text else ''
+
+        return mark_safe(get_or_build(
+            cls.cache_key(), render, PAGE_TREE_CACHE_TIMEOUT))
+
+    @classmethod
+    def clear_cache(cls):
+        cache.delete(cls.cache_key())
+
     class Meta:
         verbose_name_plural = 'Footer Text'
 
 
+class ImagePlaceholder(models.Model):
+    """
+    What to show in place of an image while it loads: its average colour
+    and a tiny version of it, small enough to inline in the page as a data
+    URI. Made in the background when an image is uploaded or its file is
+    replaced (see base/signals.py), and by the generate_placeholders
+    management command for existing images. Shown by the image_placeholder
+    tag of base/templatetags/image_tags.py.
+    """
+    image = models.OneToOneField(
+        'wagtailimages.Image',
+        on_delete=models.CASCADE,
+        related_name='placeholder'
+    )
+    # The image file the placeholder was made from
+    file_name = models.CharField(max_length=255, editable=False)
+    color = models.CharField(max_length=7)
+    data_uri = models.TextField()
+
+    def __str__(self):
+        return self.file_name
+
+    @classmethod
+    def update_for(cls, image):
+        """
+        Make the placeholder of `image`, unless it was already made from
+        the image's current file.
+        """
+        placeholder = cls.objects.filter(image=image).first()
+        if placeholder is not None and placeholder.file_name == image.file.name:
+            return placeholder
+        color, data_uri = make_placeholder(image)
+        placeholder, created = cls.objects.update_or_create(image=image, defaults={
+            'file_name': image.file.name,
+            'color': color,
+            'data_uri': data_uri,
+        })
+        return placeholder
+
+    @classmethod
+    def update_for_id(cls, image_id):
+        # update_for, for the image as it is when the task runs
+        image = get_image_model().objects.filter(pk=image_id).first()
+        if image is not None:
+            return cls.update_for(image)
+
+
+class RelatedPage(models.Model):
+    """
+    One of the pages most related to `page` by the tags they share, with
+    their Jaccard similarity as `score`. Computed by base/related.py, for
+    the related_pages tag of base/templatetags/related_tags.py.
+    """
+    page = models.ForeignKey(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        related_name='related_pages'
+    )
+    related_page = models.ForeignKey(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['page', '-score']
+        unique_together = ('page', 'related_page')
+
+    def __str__(self):
+        return '{} -> {}'.format(self.page_id, self.related_page_id)
+
+
 class StandardPage(Page):
     """
     A generic content page. On this demo site we use it for an about page but
@@ -235,6 +339,26 @@ class HomePage(Page):
         ], heading="Featured homepage sections", classname="collapsible"),
     ]
 
+    # The number of child pages shown in each featured section on
+    # templates/base/home_page.html, and the rendition of their images
+    FEATURED_SECTIONS = (
+        ('featured_section_1', 3, 'fill-180x140-c100'),
+        ('featured_section_2', 3, 'fill-430x210-c100'),
+        ('featured_section_3', 6, 'fill-430x254-c100'),
+    )
+
+    # Adds the child pages of each featured section to the context, with
+    # their images and renditions loaded in bulk rather than card by card
+    def get_context(self, request):
+        context = super(HomePage, self).get_context(request)
+        for field_name, count, filter_spec in self.FEATURED_SECTIONS:
+            section = getattr(self, field_name)
+            children = []
+            if section is not None and hasattr(section.specific, 'children'):
+                children = list(section.specific.children()[:count])
+                prefetch_images(children, filter_spec)
+            context[field_name + '_children'] = children
+        return context
 
     def __str__(self):
         return self.title
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.base import metrics
+from collidersite.base.cache import (
+    PAGE_TREE_CACHE_TIMEOUT, get_or_build, get_page_tree_version
+)
+
+
+# How many levels below the site root are included in the header menu:
+# the top menu items, their drop downs and one level below those.
+MENU_DEPTH = 3
+
+
+def build_menu_tree(root):
+    """
+    Build the in-menu navigation tree below `root` with a single query.
+
+    Each node is a plain dict (id, title, url_path, url, depth, children) so
+    the whole tree can be pickled into the cache and rendered without
+    touching the database. A page is only included if all of its ancestors
+    below the root are live and shown in menus, as the menu can't reach it
+    otherwise.
+    """
+    pages = Page.objects.descendant_of(root).live().in_menu().filter(
+        depth__lte=root.depth + MENU_DEPTH
+    ).order_by('path').values_list('id', 'title', 'url_path', 'path', 'depth')
+
+    nodes_by_path = {root.path: {'children': []}}
+    for page_id, title, url_path, path, depth in pages:
+        parent = nodes_by_path.get(path[:-Page.steplen])
+        if parent is None:
+            continue
+        node = {
+            'id': page_id,
+            'title': title,
+            'url_path': url_path,
+            'url': site_url(url_path, root),
+            'depth': depth,
+            'children': [],
+        }
+        parent['children'].append(node)
+        nodes_by_path[path] = node
+
+    return nodes_by_path[root.path]['children']
+
+
+def get_menu_tree(root):
+    """
+    Return the cached navigation tree below `root`, building it on a miss.
+    The key includes the page tree version, so publishing, unpublishing,
+    moving or deleting any page causes a rebuild on the next request.
+    """
+    key = 'collidersite:menu:{}:{}'.format(get_page_tree_version(), root.id)
+    return get_or_build(
+        key, lambda: build_menu_tree(root), PAGE_TREE_CACHE_TIMEOUT)
+
+
+def site_url(url_path, root):
+    # url_path includes the site root's slug, which isn't part of the public
+    # URL
+    return '/' + url_path[len(root.url_path):]
+
+
+def get_breadcrumbs(page, root):
+    """
+    Return the breadcrumb trail for `page` as a list of dicts (title, url),
+    from the site root down to and including the page itself.
+
+    Treebeard paths already encode every ancestor: the ancestor at depth n
+    is the first n steps of the page's path. Each ancestor's title and
+    url_path is cached under its own path segment, so sibling and child
+    pages share entries and a warm cache resolves the trail without a
+    query. The keys carry the page tree version, so renaming, moving or
+    unpublishing an ancestor refreshes every trail below it.
+    """
+    version = get_page_tree_version()
+    # Depth 1 is the tree root, which is never part of a site
+    paths = [page.path[:depth * Page.steplen]
+             for depth in range(2, page.depth + 1)]
+    keys = ['collidersite:crumb:{}:{}'.format(version, path) for path in paths]
+    crumbs = cache.get_many(keys)
+
+    missing = [path for path, key in zip(paths, keys) if key not in crumbs]
+    metrics.record_cache(hits=len(crumbs), misses=len(missing))
+    if missing:
+        fetched = {}
+        for path, title, url_path in Page.objects.filter(
+                path__in=missing).values_list('path', 'title', 'url_path'):
+            key = 'collidersite:crumb:{}:{}'.format(version, path)
+            fetched[key] = crumbs[key] = (title, url_path)
+        cache.set_many(fetched, PAGE_TREE_CACHE_TIMEOUT)
+
+    return [
+        {'title': crumbs[key][0], 'url': site_url(crumbs[key][1], root)}
+        for key in keys if key in crumbs
+    ]
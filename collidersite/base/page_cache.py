@@ -0,0 +1,242 @@
+"""
+Full-page cache for Wagtail pages served to anonymous visitors.
+
+Responses rendered by wagtail.wagtailcore.views.serve are stored in the
+default cache, keyed by site, path and the query parameters that change the
+page (PAGE_CACHE_QUERY_PARAMS). Each entry records the page tree and content
+versions it was rendered under; publishing a page or saving a snippet or
+image bumps one of them, which purges every entry at once. The navigation,
+breadcrumbs and footer are on every page, so there is no smaller set of
+entries that a publish can be relied on not to affect.
+
+With PAGE_CACHE_STALE_WHILE_REVALIDATE, expired and purged entries are kept
+for another PAGE_CACHE_STALE_TIMEOUT and served as they are while the page
+is re-rendered in the background. A lock in the cache makes sure only one
+process re-renders a given page at a time. Pages that stop being public
+(unpublished, deleted or made private) must never be served stale, so the
+keys of each page's entries are listed under the page and deleted outright
+by delete_page.
+"""
+import hashlib
+import io
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+
+from collidersite.base import background, metrics
+from collidersite.base.cache import (
+    bump_content_version, get_content_version, get_page_tree_version
+)
+
+
+# Cached pages may contain forms (e.g. the contact form on the home page).
+# Their CSRF tokens belong to whoever rendered the page, so they are swapped
+# for this placeholder when stored and for the visitor's own token on a hit.
+CSRF_PLACEHOLDER = b'collidersite-page-cache-csrf-token'
+CSRF_TOKEN_RE = re.compile(
+    br'''(name=["']csrfmiddlewaretoken["'] value=["'])[^"']+''')
+
+# Query parameters added by campaign links, which never change the page
+IGNORED_QUERY_PARAM_PREFIXES = ('utm_',)
+IGNORED_QUERY_PARAMS = ('fbclid', 'gclid')
+
+
+def get_cache_key(request):
+    """
+    Return the page cache key for `request`, or None if it must bypass the
+    cache: non-GET requests such as form POSTs, logged in users, visitors
+    with pending messages and query strings the cache doesn't know about.
+    """
+    if not getattr(settings, 'PAGE_CACHE_ENABLED', False):
+        return None
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if getattr(request, 'site', None) is None:
+        return None
+    if request.user.is_authenticated:
+        return None
+    if 'messages' in request.COOKIES or '_messages' in request.session:
+        return None
+
+    params = []
+    for name, values in sorted(request.GET.lists()):
+        if name in settings.PAGE_CACHE_QUERY_PARAMS:
+            params.extend((name, value) for value in values)
+        elif not (name in IGNORED_QUERY_PARAMS or
+                  name.startswith(IGNORED_QUERY_PARAM_PREFIXES)):
+            return None
+
+    url = request.path
+    if params:
+        url += '?' + urlencode(params)
+    return 'collidersite:page:{}:{}'.format(
+        request.site.id, hashlib.md5(url.encode('utf-8')).hexdigest())
+
+
+def current_versions():
+    return (get_page_tree_version(), get_content_version())
+
+
+def get_entry(key):
+    """
+    Return a (entry, is_fresh) pair for `key`. Stale entries are only
+    returned when stale-while-revalidate is on; otherwise they count as a
+    miss and entry is None.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        metrics.record_cache(misses=1)
+        return None, False
+    metrics.record_cache(hits=1)
+    is_fresh = (entry['versions'] == current_versions() and
+                time.time() - entry['created'] < settings.PAGE_CACHE_TIMEOUT)
+    if not is_fresh and not settings.PAGE_CACHE_STALE_WHILE_REVALIDATE:
+        return None, False
+    return entry, is_fresh
+
+
+def is_cacheable(request, response):
+    # Only responses of pages served by Wagtail are stored; the
+    # before_serve_page hook in base/wagtail_hooks.py marks those requests
+    page = getattr(request, 'served_page', None)
+    if page is None or request.method != 'GET':
+        return False
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies or response.has_header('Vary'):
+        return False
+    cache_control = response.get('Cache-Control', '')
+    if 'private' in cache_control or 'no-store' in cache_control:
+        return False
+    # Images on the page are shown in full size until their renditions exist
+    if getattr(request, 'page_cache_incomplete', False):
+        return False
+    # Rendering the page consumed flash messages meant for this visitor only
+    messages = getattr(request, '_messages', None)
+    if messages is not None and messages.used:
+        return False
+    # Private pages must never be served to visitors who haven't passed the
+    # view restriction, which includes the password form shown in their place
+    return not page.get_view_restrictions().exists()
+
+
+def get_page_keys_key(page_id):
+    return 'collidersite:page-keys:{}'.format(page_id)
+
+
+def store(key, request, response):
+    content = response.content
+    if response.get('Content-Type', '').startswith('text/html'):
+        content = CSRF_TOKEN_RE.sub(br'\g<1>' + CSRF_PLACEHOLDER, content)
+    entry = {
+        'status': response.status_code,
+        'content': content,
+        'headers': list(response.items()),
+        'versions': current_versions(),
+        'created': time.time(),
+        'metrics_label': metrics.get_label(request),
+    }
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    if settings.PAGE_CACHE_STALE_WHILE_REVALIDATE:
+        timeout += settings.PAGE_CACHE_STALE_TIMEOUT
+    cache.set(key, entry, timeout)
+
+    # Entries outlive a version bump, so the list has to as well
+    keys_key = get_page_keys_key(request.served_page.id)
+    keys = cache.get(keys_key) or []
+    if key not in keys:
+        cache.set(keys_key, keys + [key], None)
+
+
+def build_response(request, entry, is_fresh=True):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        # get_token also flags the request so CsrfViewMiddleware sets the
+        # matching cookie on the way out
+        content = content.replace(
+            CSRF_PLACEHOLDER, get_token(request).encode('ascii'))
+    response = HttpResponse(content, status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['X-Page-Cache'] = 'HIT' if is_fresh else 'STALE'
+    # Feeds (see blog/feeds.py) set both, and feed readers send them back
+    etag = response.get('ETag')
+    last_modified = parse_http_date_safe(response.get('Last-Modified'))
+    if etag or last_modified:
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=response)
+    return response
+
+
+# The parts of the original request's environ that affect how a page is
+# rendered for an anonymous visitor
+REVALIDATE_ENVIRON_KEYS = (
+    'HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'SCRIPT_NAME', 'PATH_INFO',
+    'QUERY_STRING', 'HTTP_X_FORWARDED_PROTO', 'HTTP_X_FORWARDED_HOST',
+    'wsgi.url_scheme',
+)
+
+_handler = None
+
+
+def schedule_revalidation(key, request):
+    """
+    Queue a background re-render of the page cached under `key`, unless
+    another process or thread is already re-rendering it.
+    """
+    lock_key = key + ':lock'
+    if cache.add(lock_key, True, settings.PAGE_CACHE_LOCK_TIMEOUT):
+        environ = dict(
+            (name, request.META[name])
+            for name in REVALIDATE_ENVIRON_KEYS if name in request.META)
+        background.enqueue(revalidate, key, lock_key, environ)
+
+
+def revalidate(key, lock_key, environ):
+    global _handler
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+
+    environ = dict(environ, REQUEST_METHOD='GET')
+    environ['wsgi.input'] = io.BytesIO()
+    request = WSGIRequest(environ)
+    # Tells PageCacheMiddleware to render the page even though there is an
+    # entry for it, and to drop the entry if the page can't be cached anymore
+    request.page_cache_revalidate = True
+    try:
+        response = _handler.get_response(request)
+        response.close()
+    finally:
+        cache.delete(lock_key)
+
+
+def delete(key):
+    cache.delete(key)
+
+
+def delete_page(page_id):
+    """
+    Drop every cached entry of the page with `page_id`, stale ones included,
+    e.g. once it has been unpublished.
+    """
+    keys_key = get_page_keys_key(page_id)
+    cache.delete_many((cache.get(keys_key) or []) + [keys_key])
+
+
+def purge():
+    """
+    Invalidate every cached page. Called when content shown across the site
+    but stored outside the page tree changes; page changes already bump the
+    page tree version. With stale-while-revalidate the entries are kept and
+    re-rendered on their next request instead of being dropped.
+    """
+    bump_content_version()
@@ -0,0 +1,17 @@
+from collidersite.base.images import prefetch_renditions
+
+# The rendition of people's photos in the lists of people on location,
+# partner and industry pages
+AVATAR_FILTER_SPEC = 'fill-50x50-c100'
+
+
+def get_listed_people(people):
+    """
+    Return the live people of `people`, a queryset of Person pages (such as
+    a page's people_covering), as a list. Their locations, images and the
+    avatar renditions of the images are loaded in bulk, for templates to
+    show them without a query per person.
+    """
+    people = list(people.live().select_related('location', 'image'))
+    prefetch_renditions([person.image for person in people], AVATAR_FILTER_SPEC)
+    return people
@@ -0,0 +1,189 @@
+"""
+Related pages by tag overlap, across blog posts, partners and industries.
+
+Comparing the tags of a page with those of every other page through the
+taggit joins is far too slow to do while serving it, so the neighbours of
+each page are computed ahead of time and stored as RelatedPage rows, which
+the related_pages tag of base/templatetags/related_tags.py shows.
+
+build_related_pages loads all (page, tag) pairs of the through models in
+RELATED_TAG_MODELS into a sparse page-by-tag matrix and computes the Jaccard
+similarity of every pair of pages that share a tag with NumPy, BLOCK_SIZE
+pages at a time. The RELATED_PAGES_COUNT most similar pages of each page are
+kept. Memory grows with the number of such pairs in a block, not with the
+number of pages times the number of tags.
+
+Publishing or unpublishing a tagged page only changes the rows of the pages
+that share a tag with it or list it as related; update_related_pages_for
+recomputes those on the background worker (see base/signals.py), out of a
+matrix of the pages that can be related to them rather than of all pages.
+"""
+import numpy
+
+from django.apps import apps
+from django.db import transaction
+
+from collidersite.base.models import RelatedPage
+
+
+# The TaggedItemBase models of the pages that are related to each other
+RELATED_TAG_MODELS = [
+    'blog.BlogPageTag',
+    'partners.PartnerPageTag',
+    'industries.IndustryPageTag',
+]
+
+# The number of related pages kept per page
+RELATED_PAGES_COUNT = 6
+
+# The number of pages whose similarities are computed at once, which bounds
+# the memory used to the pages sharing a tag with BLOCK_SIZE pages
+BLOCK_SIZE = 512
+
+
+def get_related_page_models():
+    # The page models tagged through RELATED_TAG_MODELS
+    return [
+        apps.get_model(label)._meta.get_field('content_object').related_model
+        for label in RELATED_TAG_MODELS
+    ]
+
+
+def get_tag_pairs(**filters):
+    # The (page id, tag id) pairs of the live pages of RELATED_TAG_MODELS,
+    # filtered by `filters` on the through models
+    pairs = set()
+    for label in RELATED_TAG_MODELS:
+        pairs.update(apps.get_model(label).objects.filter(
+            content_object__live=True, **filters
+        ).values_list('content_object_id', 'tag_id'))
+    return pairs
+
+
+def _ranges(starts, lengths):
+    # The indexes of the slices starts[i]:starts[i] + lengths[i], one after
+    # the other
+    offsets = numpy.cumsum(lengths) - lengths
+    return numpy.repeat(starts - offsets, lengths) + numpy.arange(lengths.sum())
+
+
+class TagMatrix(object):
+    """
+    The tags of the live pages of RELATED_TAG_MODELS, or of the pages of
+    `pairs` (see get_tag_pairs), as a sparse 0/1 matrix with a row per page
+    (`page_ids`) and a column per tag. It is kept both by row (the tags of
+    each page) and by column (the pages of each tag), as in CSR and CSC.
+
+    A page is only compared with the pages of the matrix, so its scores are
+    right if all the pages that share a tag with it are in it, with all
+    their tags.
+    """
+    def __init__(self, pairs=None):
+        if pairs is None:
+            pairs = get_tag_pairs()
+        # Sorted by page, then tag
+        pairs = numpy.array(sorted(pairs), dtype=numpy.int64).reshape(-1, 2)
+
+        self.page_ids, rows = numpy.unique(pairs[:, 0], return_inverse=True)
+        tag_ids, columns = numpy.unique(pairs[:, 1], return_inverse=True)
+        self.page_tags = columns
+        self.tag_counts = numpy.bincount(rows, minlength=len(self.page_ids))
+        self.page_starts = numpy.concatenate(([0], numpy.cumsum(self.tag_counts)))
+        self.tag_pages = rows[numpy.argsort(columns, kind='mergesort')]
+        self.tag_starts = numpy.concatenate((
+            [0], numpy.cumsum(numpy.bincount(columns, minlength=len(tag_ids)))))
+        self.rows = dict((page_id, row) for row, page_id in enumerate(self.page_ids.tolist()))
+
+    def get_neighbours(self, page_ids):
+        """
+        Yield (page id, [(related page id, score), ...]) for each of
+        `page_ids` that has tags, its RELATED_PAGES_COUNT most similar
+        pages first. Pages that share no tag are never related.
+
+        The tags two pages share are counted from the pages of each tag of
+        the first, so only pairs of pages that share a tag are ever looked
+        at, BLOCK_SIZE pages at a time.
+        """
+        rows = numpy.array(
+            [self.rows[page_id] for page_id in page_ids if page_id in self.rows],
+            dtype=numpy.int64)
+        page_count = len(self.page_ids)
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            # The tags of each page of the block, then the pages of each tag
+            lengths = self.tag_counts[block]
+            positions = numpy.repeat(numpy.arange(len(block)), lengths)
+            tags = self.page_tags[_ranges(self.page_starts[block], lengths)]
+            lengths = self.tag_starts[tags + 1] - self.tag_starts[tags]
+            positions = numpy.repeat(positions, lengths)
+            others = self.tag_pages[_ranges(self.tag_starts[tags], lengths)]
+
+            # Each pair of pages comes up once per tag they share
+            pairs, shared = numpy.unique(
+                positions * page_count + others, return_counts=True)
+            positions, others = pairs // page_count, pairs % page_count
+            # A page isn't related to itself
+            other = others != block[positions]
+            positions, others, shared = positions[other], others[other], shared[other]
+            union = self.tag_counts[block[positions]] + self.tag_counts[others] - shared
+            scores = shared / union.astype(numpy.float64)
+
+            # The best first for each page, the newest among equal scores
+            order = numpy.lexsort((-self.page_ids[others], -scores, positions))
+            related_ids = self.page_ids[others[order]].tolist()
+            scores = scores[order].tolist()
+            firsts = numpy.searchsorted(positions[order], numpy.arange(len(block) + 1))
+            for i, row in enumerate(block.tolist()):
+                top = slice(firsts[i], min(firsts[i + 1], firsts[i] + RELATED_PAGES_COUNT))
+                yield int(self.page_ids[row]), list(zip(related_ids[top], scores[top]))
+
+
+def update_related_pages(page_ids=None, matrix=None):
+    """
+    Recompute the RelatedPage rows of `page_ids`, or of all pages, out of
+    `matrix` if the caller already has one (see TagMatrix for which pages
+    it must hold). Returns the number of pages updated.
+    """
+    if matrix is None:
+        matrix = TagMatrix()
+    if page_ids is None:
+        # Also drops the rows of pages that have lost all their tags
+        page_ids = matrix.page_ids.tolist()
+        outdated = RelatedPage.objects.all()
+    else:
+        page_ids = sorted(page_ids)
+        outdated = RelatedPage.objects.filter(page_id__in=page_ids)
+
+    related = []
+    for page_id, neighbours in matrix.get_neighbours(page_ids):
+        related.extend(
+            RelatedPage(page_id=page_id, related_page_id=related_page_id, score=score)
+            for related_page_id, score in neighbours)
+    with transaction.atomic():
+        outdated.delete()
+        RelatedPage.objects.bulk_create(related, batch_size=1000)
+    return len(page_ids)
+
+
+def update_related_pages_for(page_id):
+    """
+    Recompute the RelatedPage rows that publishing or unpublishing the page
+    with `page_id` may have changed: its own, those of the pages sharing a
+    tag with it, and those of the pages that listed it as related.
+
+    Only the pages sharing a tag with one of those can be related to them,
+    so the matrix is made of those pages alone, which keeps it to a few
+    rows where the full one has a row per tagged page.
+    """
+    tag_ids = set(tag_id for _, tag_id in get_tag_pairs(content_object_id=page_id))
+    page_ids = set(
+        sharing_id for sharing_id, _ in get_tag_pairs(tag_id__in=tag_ids))
+    page_ids.add(page_id)
+    page_ids.update(RelatedPage.objects.filter(
+        related_page_id=page_id).values_list('page_id', flat=True))
+
+    tag_ids = set(tag_id for _, tag_id in get_tag_pairs(content_object_id__in=page_ids))
+    candidate_ids = set(
+        candidate_id for candidate_id, _ in get_tag_pairs(tag_id__in=tag_ids))
+    matrix = TagMatrix(get_tag_pairs(content_object_id__in=candidate_ids))
+    return update_related_pages(page_ids, matrix)
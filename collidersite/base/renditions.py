@@ -0,0 +1,371 @@
+"""
+Registry of the image renditions the templates use, by image usage, and
+generation of the ones that are missing.
+
+Renditions are otherwise generated inside the request that first shows
+them. Instead, the sync_renditions management command creates every missing
+rendition after a deploy (and deletes the ones no template uses anymore), and images are queued on the background
+worker when they are uploaded or changed and when a page using them is
+published. With RENDITIONS_GENERATE_IN_REQUEST off, the {% image %} tag of
+base/templatetags/image_tags.py queues a rendition that still doesn't exist
+rather than waiting for it, and with RENDITIONS_LAZY_URLS it links to a view
+that generates it instead, see base/images.py.
+
+When a template starts using a new filter spec, add it to its usage below.
+"""
+import logging
+import multiprocessing
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.formats import get_image_formats
+from wagtail.wagtailimages.models import Filter, SourceImageIOError
+
+from collidersite.base import background
+from collidersite.base.image_filters import create_renditions, get_webp
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImageUsage(object):
+    """
+    Images chosen through the `field_name` foreign key of live pages of
+    `model` (an "app_label.ModelName" string), shown with `filter_specs`.
+    """
+    def __init__(self, name, model, field_name, filter_specs):
+        self.name = name
+        self.model_label = model
+        self.field_name = field_name
+        self.filter_specs = tuple(filter_specs)
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def get_pages(self):
+        return self.model.objects.live()
+
+    def get_image_ids(self, image_ids=None):
+        """
+        Return the ids of the images with this usage, out of `image_ids`
+        if given.
+        """
+        pages = self.get_pages().exclude(**{self.field_name: None})
+        if image_ids is not None:
+            pages = pages.filter(**{self.field_name + '__in': image_ids})
+        return set(pages.values_list(self.field_name, flat=True))
+
+    def get_page_image_ids(self, page):
+        # The images of this usage shown on `page`
+        if isinstance(page, self.model):
+            image_id = getattr(page, self.field_name + '_id')
+            if image_id:
+                return {image_id}
+        return set()
+
+
+class FeaturedPageUsage(ImageUsage):
+    """
+    Images of the child pages listed in one of the featured sections of the
+    home page, by the `section` foreign key of HomePage.
+    """
+    def __init__(self, name, section, filter_specs):
+        super(FeaturedPageUsage, self).__init__(
+            name, 'base.HomePage', section, filter_specs)
+
+    def get_sections(self):
+        return self.model.objects.live().exclude(
+            **{self.field_name: None}).values_list(self.field_name, flat=True)
+
+    def get_images_of_children(self, sections, image_ids=None):
+        Page = apps.get_model('wagtailcore.Page')
+        image_ids_found = set()
+        for section in Page.objects.filter(id__in=sections):
+            for child in section.get_children().live().specific():
+                image_id = getattr(child, 'image_id', None)
+                if image_id and (image_ids is None or image_id in image_ids):
+                    image_ids_found.add(image_id)
+        return image_ids_found
+
+    def get_image_ids(self, image_ids=None):
+        return self.get_images_of_children(self.get_sections(), image_ids)
+
+    def get_page_image_ids(self, page):
+        # Either the home page itself or a child page of a featured section
+        if isinstance(page, self.model):
+            section = getattr(page, self.field_name + '_id')
+            return self.get_images_of_children([section]) if section else set()
+        parent = page.get_parent()
+        if parent is not None and parent.id in set(self.get_sections()):
+            image_id = getattr(page, 'image_id', None)
+            return {image_id} if image_id else set()
+        return set()
+
+
+class GalleryUsage(ImageUsage):
+    """
+    Images in the collections shown by live GalleryPages.
+    """
+    def __init__(self, name, filter_specs):
+        super(GalleryUsage, self).__init__(
+            name, 'base.GalleryPage', 'collection', filter_specs)
+
+    def get_image_ids(self, image_ids=None):
+        images = get_image_model().objects.filter(
+            collection__in=self.get_pages().values('collection'))
+        if image_ids is not None:
+            images = images.filter(id__in=image_ids)
+        return set(images.values_list('id', flat=True))
+
+    def get_page_image_ids(self, page):
+        if isinstance(page, self.model) and page.collection_id:
+            return set(get_image_model().objects.filter(
+                collection=page.collection_id).values_list('id', flat=True))
+        return set()
+
+
+class BodyImageUsage(ImageUsage):
+    """
+    Images of the image blocks in the `body` StreamField of live pages of
+    the given models.
+    """
+    def __init__(self, name, models, filter_specs):
+        super(BodyImageUsage, self).__init__(name, None, 'body', filter_specs)
+        self.model_labels = models
+
+    def get_page_image_ids(self, page):
+        body = getattr(page, self.field_name, None)
+        if body is None:
+            return set()
+        return set(
+            block.value['image'].id for block in body
+            if block.block_type == 'image_block' and block.value['image'])
+
+    def get_image_ids(self, image_ids=None):
+        found = set()
+        for label in self.model_labels:
+            pages = apps.get_model(label).objects.live()
+            if image_ids is not None:
+                # StreamField is stored as JSON text; narrow the pages down
+                # before parsing their bodies
+                query = Q()
+                for image_id in image_ids:
+                    query |= Q(body__contains='"image": {}'.format(image_id))
+                pages = pages.filter(query)
+            for page in pages.iterator():
+                found |= self.get_page_image_ids(page)
+        if image_ids is not None:
+            found &= set(image_ids)
+        return found
+
+
+# Hero images are rendered by base/include/header-hero.html on the blog,
+# location and form pages.
+HERO = 'fill-1920x1920'
+
+# The images of related pages, see base/templatetags/related_tags.py
+RELATED = 'fill-300x200-c100'
+
+IMAGE_USAGES = [
+    ImageUsage('person_photo', 'people.Person', 'image', [
+        'fill-100x100-c100',  # people index
+        'fill-50x50-c100',  # authors on blog and industry pages
+        'fill-50x50',  # Person.thumb_image
+        'width-500',  # person page
+    ]),
+    ImageUsage('blog_image', 'blog.BlogPage', 'image', [
+        'fill-900x300-c50', 'fill-1920x600', HERO, RELATED]),
+    ImageUsage('partner_image', 'partners.PartnerPage', 'image', [
+        'fill-600x600-c100', 'width-500', RELATED]),
+    ImageUsage('industry_image', 'industries.IndustryPage', 'image', [
+        'fill-600x600-c100', 'width-500', RELATED]),
+    ImageUsage('location_image', 'locations.LocationPage', 'image', [
+        'fill-180x180-c75', 'fill-1920x1024', HERO]),
+    ImageUsage('bread_image', 'breads.BreadPage', 'image', [
+        'fill-180x180-c100', 'width-500']),
+    ImageUsage('standard_page_image', 'base.StandardPage', 'image', ['width-500']),
+    ImageUsage('gallery_page_image', 'base.GalleryPage', 'image', ['fill-1920x600']),
+    ImageUsage('form_page_image', 'base.FormPage', 'image', [HERO]),
+    ImageUsage('promo_image', 'base.HomePage', 'promo_image', ['fill-200x200-c100']),
+    FeaturedPageUsage('featured_section_1', 'featured_section_1', ['fill-180x140-c100']),
+    FeaturedPageUsage('featured_section_2', 'featured_section_2', ['fill-430x210-c100']),
+    FeaturedPageUsage('featured_section_3', 'featured_section_3', ['fill-430x254-c100']),
+    # GALLERY_FILTER_SPECS of base/templatetags/gallery_tags.py
+    GalleryUsage('gallery', [
+        'fill-285x200-c100', 'fill-570x400-c100', 'fill-855x600-c100']),
+    BodyImageUsage('body_image', [
+        'base.StandardPage', 'base.HomePage', 'blog.BlogPage',
+        'partners.PartnerPage', 'industries.IndustryPage',
+        'locations.LocationPage', 'breads.BreadPage',
+    ], ['fill-1920x1080']),
+]
+
+
+# Renditions made by the Wagtail admin, which sync_renditions leaves alone
+ADMIN_FILTER_SPECS = ['max-165x165', 'max-800x600', 'original', 'width-200']
+
+
+def get_protected_filter_specs():
+    """
+    The filter specs of renditions that are used outside of IMAGE_USAGES:
+    the admin's and those of images embedded in rich text.
+    """
+    return set(ADMIN_FILTER_SPECS) | set(
+        image_format.filter_spec for image_format in get_image_formats())
+
+
+def get_required_renditions(image_ids=None, usages=None):
+    """
+    Return a dict of image id to the set of filter specs the templates need
+    for it, for every image (or those in `image_ids`).
+    """
+    required = {}
+    for usage in usages or IMAGE_USAGES:
+        for image_id in usage.get_image_ids(image_ids):
+            required.setdefault(image_id, set()).update(usage.filter_specs)
+    return required
+
+
+def get_page_renditions(page):
+    # Like get_required_renditions, for the images shown on one page
+    required = {}
+    for usage in IMAGE_USAGES:
+        for image_id in usage.get_page_image_ids(page):
+            required.setdefault(image_id, set()).update(usage.filter_specs)
+    return required
+
+
+def get_required_keys(required):
+    """
+    Return the (image id, filter spec, focal point key) of each rendition
+    in a dict of image id to filter specs, the key it is stored under.
+    """
+    images = get_image_model().objects.in_bulk(list(required))
+    filters = {}
+    keys = set()
+    for image_id, specs in required.items():
+        image = images.get(image_id)
+        if image is None:
+            continue
+        for spec in specs:
+            image_filter = filters.setdefault(spec, Filter(spec=spec))
+            keys.add((image_id, image_filter.spec, image_filter.get_cache_key(image)))
+    return keys
+
+
+def group_keys(keys):
+    # Rendition keys as a dict of image id to filter specs
+    grouped = {}
+    for image_id, spec, focal_point_key in keys:
+        grouped.setdefault(image_id, set()).add(spec)
+    return grouped
+
+
+def get_missing_renditions(required):
+    """
+    Narrow down a dict of image id to filter specs to the renditions that
+    don't exist yet, or were made before the image's focal point changed.
+    """
+    keys = get_required_keys(required)
+    existing = set(
+        get_image_model().get_rendition_model().objects.filter(
+            image_id__in=set(image_id for image_id, spec, key in keys)).values_list(
+            'image_id', 'filter_spec', 'focal_point_key'))
+    return group_keys(keys - existing)
+
+
+def generate_renditions(image_id, filter_specs):
+    """
+    Generate the renditions of `filter_specs` for one image, skipping those
+    that already exist. The missing ones are made together, out of a single
+    decoding of the image. Returns the number of specs that failed.
+    """
+    try:
+        image = get_image_model().objects.get(id=image_id)
+    except get_image_model().DoesNotExist:
+        return 0
+    try:
+        create_renditions(image, filter_specs)
+    except SourceImageIOError:
+        logger.warning("Image %s has no source file", image_id)
+        return len(filter_specs)
+    except Exception:
+        logger.exception(
+            "Renditions %s of image %s failed", ', '.join(sorted(filter_specs)), image_id)
+        return len(filter_specs)
+    return 0
+
+
+def _generate(task):
+    image_id, filter_specs = task
+    return len(filter_specs), generate_renditions(image_id, filter_specs)
+
+
+def generate_in_parallel(missing, workers):
+    """
+    Generate a dict of image id to missing filter specs with a pool of
+    `workers` processes. Returns the numbers of renditions generated and
+    of those that failed.
+    """
+    # Forked workers must not share the parent's database connection
+    connections.close_all()
+    pool = multiprocessing.Pool(workers)
+    generated = failed = 0
+    try:
+        # All missing renditions of an image are made by the same worker
+        for count, errors in pool.imap_unordered(_generate, sorted(missing.items())):
+            generated += count - errors
+            failed += errors
+    finally:
+        pool.close()
+        pool.join()
+    return generated, failed
+
+
+def generate_missing(required):
+    for image_id, specs in get_missing_renditions(required).items():
+        generate_renditions(image_id, specs)
+
+
+def schedule_image(image_id):
+    """
+    Queue the generation of the renditions that an uploaded or changed
+    image needs on the background worker.
+    """
+    background.enqueue(
+        lambda: generate_missing(get_required_renditions([image_id])))
+
+
+def schedule_page(page):
+    # Queue the renditions of the images shown on a newly published page
+    background.enqueue(lambda: generate_missing(get_page_renditions(page)))
+
+
+def schedule_rendition(image_id, filter_spec):
+    """
+    Queue one rendition that a template asked for but couldn't wait for.
+    Until it exists, every request showing it asks again, so it is only
+    queued once a minute (per process, without a shared cache).
+    """
+    lock_key = 'collidersite:rendition-queued:{}:{}'.format(image_id, filter_spec)
+    if cache.add(lock_key, True, 60):
+        background.enqueue(generate_renditions, image_id, [filter_spec])
+
+
+def generate_webp(rendition_id):
+    rendition = get_image_model().get_rendition_model().objects.filter(
+        id=rendition_id).first()
+    if rendition is not None:
+        get_webp(rendition)
+
+
+def schedule_webp(rendition):
+    # Queue the WebP version of a rendition, like schedule_rendition
+    lock_key = 'collidersite:webp-queued:{}'.format(rendition.id)
+    if cache.add(lock_key, True, 60):
+        background.enqueue(generate_webp, rendition.id)
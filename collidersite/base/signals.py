@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from wagtail.wagtailcore.models import Page, PageViewRestriction
+from wagtail.wagtailcore.signals import page_published, page_unpublished
+from wagtail.wagtailimages.models import AbstractImage, AbstractRendition
+from wagtail.wagtailsnippets.models import get_snippet_models
+
+from collidersite.base import background, page_cache, related, renditions
+from collidersite.base.cache import bump_page_tree_version
+from collidersite.base.image_filters import get_webp_name
+from collidersite.base.models import FooterText, GalleryPage, ImagePlaceholder
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def page_tree_changed(sender, instance, **kwargs):
+    bump_page_tree_version()
+
+
+def delete_cached_pages(page_ids):
+    # The version bump above leaves the cached copies of a page servable
+    # while stale, which a page that is no longer public must never be. Done
+    # on commit so that a request in between can't cache the page again.
+    page_ids = list(page_ids)
+    transaction.on_commit(
+        lambda: [page_cache.delete_page(page_id) for page_id in page_ids])
+
+
+@receiver(page_unpublished)
+def page_unpublished_uncached(sender, instance, **kwargs):
+    delete_cached_pages([instance.id])
+
+
+@receiver(post_save, sender=PageViewRestriction)
+def page_made_private(sender, instance, **kwargs):
+    # Restrictions apply to the whole subtree
+    delete_cached_pages(instance.page.get_descendants(inclusive=True).values_list(
+        'id', flat=True))
+
+
+@receiver(post_save)
+def page_moved(sender, instance, update_fields=None, **kwargs):
+    # Page.move() re-saves the moved page in full once treebeard has updated
+    # the paths, whereas saving a draft revision only writes a few columns
+    # through update_fields. Drafts aren't visible on the site, so only full
+    # saves of live pages need to invalidate anything.
+    if isinstance(instance, Page) and update_fields is None and instance.live:
+        bump_page_tree_version()
+
+
+@receiver(post_delete)
+def page_deleted(sender, instance, **kwargs):
+    if isinstance(instance, Page):
+        bump_page_tree_version()
+        delete_cached_pages([instance.id])
+
+
+@receiver(post_save, sender=FooterText)
+@receiver(post_delete, sender=FooterText)
+def footer_text_changed(sender, instance, **kwargs):
+    FooterText.clear_cache()
+    # The footer is on every page
+    page_cache.purge()
+
+
+def is_content_snippet(model):
+    # Snippets shown on pages without being part of the page tree. Snippets
+    # that are pages (Person) are covered by the page hooks above.
+    return (
+        model in get_snippet_models() and model is not FooterText and
+        not issubclass(model, Page))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def content_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Changing a snippet or an image has to purge the page cache explicitly.
+    # Fixtures are loaded before anything is cached, and saves of a few
+    # fields only update metadata such as Wagtail's file sizes.
+    if raw or update_fields is not None:
+        return
+    if is_content_snippet(sender):
+        page_cache.purge()
+    elif issubclass(sender, AbstractImage):
+        if kwargs.get('created'):
+            # A new image isn't on any page yet, except the galleries of
+            # its collection
+            delete_cached_pages(GalleryPage.objects.filter(
+                collection_id=instance.collection_id).values_list('id', flat=True))
+        else:
+            page_cache.purge()
+
+
+@receiver(post_save)
+def image_saved(sender, instance, raw=False, **kwargs):
+    # New uploads can already be in a gallery's collection, and changing the
+    # focal point of an image needs new renditions wherever it's used.
+    # Fixtures are left to generate_renditions and generate_placeholders.
+    if issubclass(sender, AbstractImage) and not raw:
+        # Once the upload is committed, for the background worker to see it
+        image_id = instance.id
+        transaction.on_commit(lambda: renditions.schedule_image(image_id))
+        transaction.on_commit(
+            lambda: background.enqueue(ImagePlaceholder.update_for_id, image_id))
+
+
+@receiver(post_delete)
+def rendition_deleted(sender, instance, **kwargs):
+    # Wagtail deletes the file of a deleted rendition, but not its WebP version
+    if issubclass(sender, AbstractRendition):
+        storage = instance.file.storage
+        name = get_webp_name(instance)
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(page_published)
+def generate_page_renditions(sender, instance, **kwargs):
+    renditions.schedule_page(instance)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def update_related_pages(sender, instance, **kwargs):
+    # Publishing may have changed the page's tags, and unpublishing takes it
+    # out of the related pages of others
+    if sender in related.get_related_page_models():
+        page_id = instance.id
+        transaction.on_commit(
+            lambda: background.enqueue(related.update_related_pages_for, page_id))
@@ -0,0 +1,111 @@
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Count
+
+from taggit.models import Tag
+
+from collidersite.base.cache import (
+    PAGE_TREE_CACHE_TIMEOUT, get_or_build, get_page_tree_version
+)
+
+
+def get_child_tags(index_page, through):
+    """
+    Return the distinct tags of the live pages below `index_page`, ordered
+    by name. `through` is the pages' TaggedItemBase model (e.g.
+    BlogPageTag). Each tag gets a `count` of the pages tagged with it and
+    the `url` of its tag_archive route on the index page.
+
+    The tags are counted in a single grouped query over `through` and
+    cached under the page tree version, so publishing, unpublishing or
+    moving a child page refreshes them. They are also kept on the index
+    page instance, as templates tend to ask for them more than once.
+    """
+    if getattr(index_page, '_child_tags', None) is not None:
+        return index_page._child_tags
+
+    def build():
+        return list(
+            through.objects.filter(
+                content_object__live=True,
+                content_object__path__startswith=index_page.path,
+                content_object__depth__gt=index_page.depth,
+            ).values_list(
+                'tag_id', 'tag__name', 'tag__slug'
+            ).annotate(
+                count=Count('content_object_id', distinct=True)
+            ).order_by('tag__name')
+        )
+
+    key = 'collidersite:child-tags:{}:{}:{}'.format(
+        get_page_tree_version(), through._meta.label_lower, index_page.id)
+    rows = get_or_build(key, build, PAGE_TREE_CACHE_TIMEOUT)
+
+    index_url = index_page.url
+    tags = []
+    for tag_id, name, slug, count in rows:
+        tag = Tag(id=tag_id, name=name, slug=slug)
+        tag.count = count
+        tag.url = '{}tags/{}/'.format(index_url, slug)
+        tags.append(tag)
+    index_page._child_tags = tags
+    return tags
+
+
+def get_child_tag(index_page, through, slug):
+    """
+    Return the tag with `slug` among the child tags of `index_page` (see
+    get_child_tags), or None if no live page below it is tagged with it.
+    """
+    for tag in get_child_tags(index_page, through):
+        if tag.slug == slug:
+            return tag
+    return None
+
+
+def paginate_tagged_pages(index_page, through, tag, page_number, per_page,
+                          ordering=('content_object__path',)):
+    """
+    Return page `page_number` of the live pages below `index_page` tagged
+    with `tag`, in `ordering` (expressions on `through`), as a Paginator page
+    whose object_list is the ids of the pages. See sort_by_ids to load them.
+
+    The ids are looked up on `through` alone, on its (tag, content_object)
+    index, and cached per index page, tag and page number under the page
+    tree version, like the child tags.
+    """
+    try:
+        page_number = int(page_number)
+    except (TypeError, ValueError):
+        page_number = 1
+
+    def build():
+        paginator = Paginator(
+            through.objects.filter(
+                tag_id=tag.id,
+                content_object__live=True,
+                content_object__path__startswith=index_page.path,
+                content_object__depth__gt=index_page.depth,
+            ).order_by(*ordering).values_list('content_object_id', flat=True),
+            per_page)
+        try:
+            page = paginator.page(page_number)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
+        return page.number, paginator.count, list(page.object_list)
+
+    key = 'collidersite:tagged-pages:{}:{}:{}:{}:{}:{}'.format(
+        get_page_tree_version(), through._meta.label_lower, index_page.id,
+        tag.id, per_page, page_number)
+    number, count, ids = get_or_build(key, build, PAGE_TREE_CACHE_TIMEOUT)
+
+    # Stands in for the paginator of the cached page, which only needs the
+    # count of the pages
+    page = Paginator(range(count), per_page).page(number)
+    page.object_list = ids
+    return page
+
+
+def sort_by_ids(objects, ids):
+    # Returns `objects` as a list in the order of their `ids`
+    positions = dict((object_id, position) for position, object_id in enumerate(ids))
+    return sorted(objects, key=lambda obj: positions[obj.pk])
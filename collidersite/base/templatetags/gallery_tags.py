@@ -1,16 +1,39 @@
 from django import template
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 
 from wagtail.wagtailimages.models import Image
 
+from collidersite.base.images import prefetch_renditions
+
 register = template.Library()
 
+# Images shown per page of a gallery, see the gallery_page query parameter
+GALLERY_PAGE_SIZE = 24
+
+# The renditions of gallery images, 285px wide and twice and three times that
+# for high density screens and wider columns, offered to browsers as srcset.
+# Also listed in base/renditions.py.
+GALLERY_FILTER_SPECS = ['fill-285x200-c100', 'fill-570x400-c100', 'fill-855x600-c100']
+
 
-# Retrieves a single gallery item and returns a gallery of images
+# Retrieves a single gallery item and returns a gallery of images, a page of
+# GALLERY_PAGE_SIZE images at a time
 @register.inclusion_tag('tags/gallery.html', takes_context=True)
 def gallery(context, gallery):
-    images = Image.objects.filter(collection=gallery)
+    request = context['request']
+    paginator = Paginator(
+        Image.objects.filter(collection=gallery).select_related('collection').order_by('id'),
+        GALLERY_PAGE_SIZE)
+    try:
+        images = paginator.page(request.GET.get('gallery_page'))
+    except PageNotAnInteger:
+        images = paginator.page(1)
+    except EmptyPage:
+        images = paginator.page(paginator.num_pages)
+    images.object_list = list(images.object_list)
+    prefetch_renditions(images.object_list, *GALLERY_FILTER_SPECS)
 
     return {
         'images': images,
-        'request': context['request'],
+        'request': request,
     }
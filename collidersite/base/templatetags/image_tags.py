@@ -0,0 +1,95 @@
+from django import template
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+
+from wagtail.wagtailimages.templatetags import wagtailimages_tags
+
+from collidersite.base.image_filters import get_webp_url, webp_enabled
+from collidersite.base.images import (
+    LazyRendition, get_original_rendition, get_rendition, get_rendition_url
+)
+from collidersite.base.renditions import schedule_rendition, schedule_webp
+
+register = template.Library()
+
+
+# A drop-in replacement for Wagtail's {% image %} tag that takes the same
+# arguments, but uses renditions prefetched with base.images.prefetch_renditions
+# instead of looking each one up on its own. With "as", the rendition also has
+# the `webp_url` of its WebP version when RENDITIONS_WEBP is on, for a
+# <picture> <source>: the file's own URL when it exists, the serve_rendition
+# view's with RENDITIONS_LAZY_URLS, or None until the background worker has
+# made it.
+@register.tag(name='image')
+def image(parser, token):
+    node = wagtailimages_tags.image(parser, token)
+    return PrefetchedImageNode(
+        node.image_expr, node.filter_spec, attrs=node.attrs,
+        output_var_name=node.output_var_name)
+
+
+# Returns the ImagePlaceholder of an image, or None if it has none yet, e.g.
+# {% image_placeholder page.image as placeholder %}
+@register.simple_tag
+def image_placeholder(image):
+    if not image:
+        return None
+    try:
+        return image.placeholder
+    except ObjectDoesNotExist:
+        return None
+
+
+class PrefetchedImageNode(wagtailimages_tags.ImageNode):
+    def render(self, context):
+        try:
+            image = self.image_expr.resolve(context)
+        except template.VariableDoesNotExist:
+            return ''
+
+        if not image:
+            if self.output_var_name:
+                # Otherwise a card without an image would show the image of
+                # the previous card in the loop
+                context[self.output_var_name] = None
+            return ''
+
+        lazy_urls = getattr(settings, 'RENDITIONS_LAZY_URLS', False)
+        generate = not lazy_urls and getattr(
+            settings, 'RENDITIONS_GENERATE_IN_REQUEST', True)
+        rendition = get_rendition(image, self.filter, generate=generate)
+        if rendition is None and lazy_urls:
+            # Generated by the serve_rendition view when the browser asks
+            rendition = LazyRendition(image, self.filter)
+        elif rendition is None:
+            # Show the original until the background worker has generated
+            # the rendition, and keep the page out of the page cache meanwhile
+            schedule_rendition(image.id, self.filter.spec)
+            rendition = get_original_rendition(image)
+            request = context.get('request')
+            if request is not None:
+                request.page_cache_incomplete = True
+
+        if self.output_var_name:
+            if webp_enabled() and getattr(rendition, 'id', None) is not None:
+                # Straight from storage when it exists, or made the same way
+                # as the renditions when it doesn't
+                rendition.webp_url = get_webp_url(rendition, generate=generate)
+                if rendition.webp_url is None and lazy_urls:
+                    rendition.webp_url = get_rendition_url(image, self.filter, 'webp')
+                elif rendition.webp_url is None:
+                    # Left out of the page until the background worker has
+                    # made it
+                    schedule_webp(rendition)
+                    request = context.get('request')
+                    if request is not None:
+                        request.page_cache_incomplete = True
+            elif webp_enabled() and isinstance(rendition, LazyRendition):
+                rendition.webp_url = get_rendition_url(image, self.filter, 'webp')
+            context[self.output_var_name] = rendition
+            return ''
+
+        resolved_attrs = {}
+        for key in self.attrs:
+            resolved_attrs[key] = self.attrs[key].resolve(context)
+        return rendition.img_tag(resolved_attrs)
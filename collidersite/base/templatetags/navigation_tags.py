@@ -1,8 +1,7 @@
 from django import template
 
-from wagtail.wagtailcore.models import Page
-
 from collidersite.base.models import FooterText
+from collidersite.base.navigation import get_breadcrumbs, get_menu_tree
 
 
 register = template.Library()
@@ -17,13 +16,6 @@ def get_site_root(context):
     return context['request'].site.root_page
 
 
-def has_menu_children(page):
-    # This is used by the top_menu property
-    # get_children is a Treebeard API thing
-    # https://tabo.pe/projects/django-treebeard/docs/4.0.1/api.html
-    return page.get_children().live().in_menu().exists()
-
-
 def has_children(page):
     # Generically allow index pages to list their children
     return page.get_children().live().exists()
@@ -34,23 +26,33 @@ def is_active(page, current_page):
     return (current_page.url.startswith(page.url) if current_page else False)
 
 
+def is_active_node(node, calling_page):
+    # The menu tree holds plain dicts rather than pages, so compare url_paths
+    # instead of calling page.url, which saves a site root lookup per item
+    return (calling_page.url_path.startswith(node['url_path'])
+            if calling_page else False)
+
+
 # Retrieves the top menu items - the immediate children of the parent page
-# The has_menu_children method is necessary because the Foundation menu requires
+# The show_dropdown flag is necessary because the Foundation menu requires
 # a dropdown class to be applied to a parent
+# The items come from the cached navigation tree in base/navigation.py, so a
+# warm cache renders the whole menu without any queries
 @register.inclusion_tag('tags/top_menu.html', takes_context=True)
 def top_menu(context, parent, calling_page=None):
-    menuitems = parent.get_children().live().in_menu()
-    for menuitem in menuitems:
-        menuitem.show_dropdown = has_menu_children(menuitem)
+    menuitems = []
+    for node in get_menu_tree(parent):
         # We don't directly check if calling_page is None since the template
         # engine can pass an empty string to calling_page
         # if the variable passed as calling_page does not exist.
-        menuitem.active = (calling_page.url.startswith(menuitem.url)
-                           if calling_page else False)
+        menuitems.append(dict(
+            node,
+            show_dropdown=bool(node['children']),
+            active=is_active_node(node, calling_page),
+        ))
     return {
         'calling_page': calling_page,
         'menuitems': menuitems,
-        # required by the pageurl tag that we want to use within this template
         'request': context['request'],
     }
 
@@ -58,20 +60,16 @@ def top_menu(context, parent, calling_page=None):
 # Retrieves the children of the top menu items for the drop downs
 @register.inclusion_tag('tags/top_menu_children.html', takes_context=True)
 def top_menu_children(context, parent, calling_page=None):
-    menuitems_children = parent.get_children()
-    menuitems_children = menuitems_children.live().in_menu()
-    for menuitem in menuitems_children:
-        menuitem.has_dropdown = has_menu_children(menuitem)
-        # We don't directly check if calling_page is None since the template
-        # engine can pass an empty string to calling_page
-        # if the variable passed as calling_page does not exist.
-        menuitem.active = (calling_page.url.startswith(menuitem.url)
-                           if calling_page else False)
-        menuitem.children = menuitem.get_children().live().in_menu()
+    menuitems_children = []
+    for node in parent['children']:
+        menuitems_children.append(dict(
+            node,
+            has_dropdown=bool(node['children']),
+            active=is_active_node(node, calling_page),
+        ))
     return {
         'parent': parent,
         'menuitems_children': menuitems_children,
-        # required by the pageurl tag that we want to use within this template
         'request': context['request'],
     }
 
@@ -84,9 +82,10 @@ def breadcrumbs(context):
         ancestors = ()
         last_ancestor = ()
     else:
-        ancestors = Page.objects.ancestor_of(
-            self, inclusive=True).filter(depth__gt=1)
-        last_ancestor = ancestors.all().reverse()[0]
+        # Resolved from the page's treebeard path and the breadcrumb cache in
+        # base/navigation.py rather than an ancestor_of query
+        ancestors = get_breadcrumbs(self, context['request'].site.root_page)
+        last_ancestor = ancestors[-1]['title'] if ancestors else ()
     return {
         'ancestors': ancestors,
         'request': context['request'],
@@ -96,10 +95,6 @@ def breadcrumbs(context):
 
 @register.inclusion_tag('base/include/footer_text.html', takes_context=True)
 def get_footer_text(context):
-    footer_text = ""
-    if FooterText.objects.first() is not None:
-        footer_text = FooterText.objects.first().body
-
     return {
-        'footer_text': footer_text,
+        'footer_text': FooterText.get_rendered_html(),
     }
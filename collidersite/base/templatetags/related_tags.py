@@ -0,0 +1,27 @@
+from django import template
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.base.images import prefetch_images
+
+register = template.Library()
+
+# The rendition of the images of related pages. Also listed in
+# base/renditions.py.
+RELATED_FILTER_SPEC = 'fill-300x200-c100'
+
+
+# The pages most related to `page` by their tags, as stored by
+# base/related.py: two queries for the ids and the pages, one per page type
+# for their specific fields, and one each for their images and renditions
+@register.inclusion_tag('tags/related_pages.html', takes_context=True)
+def related_pages(context, page):
+    related_ids = list(page.related_pages.values_list('related_page_id', flat=True))
+    pages = Page.objects.live().filter(id__in=related_ids).specific()
+    pages = dict((related.id, related) for related in pages)
+    pages = [pages[related_id] for related_id in related_ids if related_id in pages]
+    prefetch_images(pages, RELATED_FILTER_SPEC)
+    return {
+        'pages': pages,
+        'request': context['request'],
+    }
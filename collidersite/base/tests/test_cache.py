@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.base.cache import get_page_tree_version
+from collidersite.base.models import StandardPage
+
+
+class PageTreeVersionTests(TestCase):
+    """
+    The page tree version, which the menu, breadcrumb and tag caches are
+    keyed by, moves on whenever the live page tree changes.
+    """
+    def setUp(self):
+        cache.clear()
+        self.root = Page.objects.get(depth=1)
+        self.section = self.root.add_child(
+            instance=StandardPage(title='Section', slug='section'))
+        self.page = self.section.add_child(
+            instance=StandardPage(title='Page', slug='page'))
+
+    def assertBumps(self, change, bumps=True):
+        version = get_page_tree_version()
+        change()
+        if bumps:
+            self.assertNotEqual(get_page_tree_version(), version)
+        else:
+            self.assertEqual(get_page_tree_version(), version)
+
+    def test_publish(self):
+        revision = self.page.save_revision()
+        self.assertBumps(revision.publish)
+
+    def test_unpublish(self):
+        self.assertBumps(self.page.unpublish)
+
+    def test_move(self):
+        other = self.root.add_child(
+            instance=StandardPage(title='Other', slug='other'))
+        self.assertBumps(lambda: self.page.move(other, pos='last-child'))
+
+    def test_delete(self):
+        self.assertBumps(self.page.delete)
+
+    def test_draft(self):
+        # Drafts aren't shown on the site
+        self.assertBumps(self.page.save_revision, bumps=False)
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import _compare_salted_tokens, get_token
+from django.test import RequestFactory, TestCase, override_settings
+
+from wagtail.wagtailcore.models import Page, Site
+
+from collidersite.base import page_cache
+from collidersite.base.models import StandardPage
+
+
+FORM = (
+    '<form method="post"><input type="hidden" name="csrfmiddlewaretoken" '
+    'value="{}"></form>')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True, PAGE_CACHE_STALE_WHILE_REVALIDATE=False)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        self.page = root.add_child(
+            instance=StandardPage(title='Cached', slug='cached'))
+        Site.objects.update(root_page=self.page)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'HIT')
+
+    def test_query_params(self):
+        self.client.get('/')
+        # Known parameters get an entry of their own
+        self.assertEqual(self.client.get('/?page=2')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/?page=2&utm_source=feed')['X-Page-Cache'], 'HIT')
+        # Unknown ones bypass the cache
+        self.assertNotIn('X-Page-Cache', self.client.get('/?q=bread'))
+
+    def test_publish_purges(self):
+        self.client.get('/')
+        self.page.save_revision().publish()
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'MISS')
+
+    def test_delete_page(self):
+        self.client.get('/')
+        self.client.get('/?page=2')
+        page_cache.delete_page(self.page.id)
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/?page=2')['X-Page-Cache'], 'MISS')
+
+    def test_csrf_token_swapped(self):
+        request = RequestFactory().get('/')
+        request.served_page = self.page
+        page_cache.store('key', request, HttpResponse(
+            FORM.format('renderers-token'), content_type='text/html'))
+        entry, is_fresh = page_cache.get_entry('key')
+        self.assertTrue(is_fresh)
+        self.assertNotIn(b'renderers-token', entry['content'])
+
+        visitor = RequestFactory().get('/')
+        content = page_cache.build_response(visitor, entry).content.decode()
+        self.assertNotIn('renderers-token', content)
+        token = content.split('value="')[1].split('"')[0]
+        self.assertTrue(_compare_salted_tokens(token, get_token(visitor)))
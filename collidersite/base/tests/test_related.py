@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.base.models import RelatedPage
+from collidersite.base.related import (
+    TagMatrix, update_related_pages, update_related_pages_for
+)
+from collidersite.blog.models import BlogIndexPage, BlogPage
+
+
+class TagMatrixTests(TestCase):
+    def test_jaccard(self):
+        matrix = TagMatrix({(1, 10), (1, 11), (2, 10), (2, 11), (2, 12), (3, 12), (4, 13)})
+        neighbours = dict(matrix.get_neighbours([1, 2, 3, 4, 5]))
+        self.assertEqual(neighbours[1], [(2, 2 / 3.0)])
+        self.assertEqual(neighbours[2], [(1, 2 / 3.0), (3, 1 / 3.0)])
+        self.assertEqual(neighbours[3], [(2, 1 / 3.0)])
+        # Pages sharing no tag aren't related, and untagged pages are left out
+        self.assertEqual(neighbours[4], [])
+        self.assertNotIn(5, neighbours)
+
+
+class UpdateRelatedPagesTests(TestCase):
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        index = root.add_child(instance=BlogIndexPage(title='Blog', slug='blog'))
+        self.posts = []
+        for i, tags in enumerate([['rye', 'sourdough'], ['rye'], ['sourdough'], ['brioche']]):
+            post = index.add_child(instance=BlogPage(title='Post', slug='post-{}'.format(i)))
+            post.tags.add(*tags)
+            post.save()
+            self.posts.append(post)
+        update_related_pages()
+
+    def get_rows(self):
+        return set(RelatedPage.objects.values_list('page_id', 'related_page_id', 'score'))
+
+    def test_update_for_matches_full_rebuild(self):
+        post = self.posts[3]
+        post.tags.add('rye')
+        post.save()
+        update_related_pages_for(post.id)
+        rows = self.get_rows()
+        update_related_pages()
+        self.assertEqual(rows, self.get_rows())
+        self.assertIn(post.id, RelatedPage.objects.filter(
+            page=self.posts[1]).values_list('related_page_id', flat=True))
+
+    def test_unpublish(self):
+        post = self.posts[0]
+        post.unpublish()
+        update_related_pages_for(post.id)
+        self.assertFalse(RelatedPage.objects.filter(page=post).exists())
+        self.assertFalse(RelatedPage.objects.filter(related_page=post).exists())
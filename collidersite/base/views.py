@@ -0,0 +1,68 @@
+import mimetypes
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.exceptions import InvalidFilterSpecError
+from wagtail.wagtailimages.models import SourceImageIOError
+from wagtail.wagtailimages.views.serve import verify_signature
+
+from collidersite.base import metrics
+from collidersite.base.image_filters import FastFilter, get_webp, webp_enabled
+
+
+@staff_member_required
+@never_cache
+def request_metrics(request):
+    # Averages per page type and route recorded by RequestMetricsMiddleware
+    metrics.flush()
+    return JsonResponse({
+        'budgets': getattr(settings, 'PAGE_BUDGETS', {}),
+        'pages': metrics.get_totals(),
+    })
+
+
+def serve_rendition(request, signature, image_id, filter_spec, version, output_format=None):
+    """
+    Serve a rendition linked to by base.images.LazyRendition, generating it
+    first if this is the first request for it, or its WebP version with
+    `output_format='webp'`. `version` only changes the URL when the image
+    does, which lets browsers and proxies keep the response for good.
+    """
+    if not verify_signature(signature.encode(), image_id, filter_spec):
+        raise PermissionDenied
+    if output_format == 'webp' and not webp_enabled():
+        raise Http404
+
+    image = get_object_or_404(get_image_model(), id=image_id)
+    try:
+        rendition = image.get_rendition(FastFilter(spec=filter_spec))
+    except SourceImageIOError:
+        return HttpResponse(
+            "Source image file not found", content_type='text/plain', status=410)
+    except InvalidFilterSpecError:
+        return HttpResponse(
+            "Invalid filter spec: " + filter_spec, content_type='text/plain', status=400)
+
+    storage = rendition.file.storage
+    name = rendition.file.name
+    if output_format == 'webp':
+        name = get_webp(rendition)
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage such as S3 serves the file itself
+        response = redirect(storage.url(name))
+    else:
+        response = FileResponse(
+            open(path, 'rb'), content_type=mimetypes.guess_type(path)[0])
+    patch_cache_control(
+        response, public=True, max_age=settings.RENDITION_CACHE_MAX_AGE,
+        immutable=True)
+    return response
@@ -1,5 +1,6 @@
 from wagtail.contrib.modeladmin.options import (
     ModelAdmin, ModelAdminGroup, modeladmin_register)
+from wagtail.wagtailcore import hooks
 
 from collidersite.breads.models import Country, BreadIngredient, BreadType
 from collidersite.partners.models import Country, PartnerPageTag, PartnerType
@@ -116,4 +117,15 @@ modeladmin_register(BakeryModelAdminGroup)
 modeladmin_register(PartnerModelAdminGroup)
 modeladmin_register(PeopleModelAdminGroup)
 modeladmin_register(LocationModelAdminGroup)
-modeladmin_register(IndustryModelAdminGroup)
\ No newline at end of file
+modeladmin_register(IndustryModelAdminGroup)
+
+
+@hooks.register('before_serve_page')
+def mark_served_page(page, request, serve_args, serve_kwargs):
+    # Lets the page cache middleware tell Wagtail page responses apart from
+    # everything else and check the page's view restrictions before storing,
+    # and labels the request metrics with the page type and route
+    request.served_page = page
+    if serve_args and callable(serve_args[0]):
+        # RoutablePageMixin.route passes the view of the matched route
+        request.served_route = serve_args[0].__name__
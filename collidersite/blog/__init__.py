@@ -0,0 +1 @@
+default_app_config = 'collidersite.blog.apps.BlogConfig'
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BlogConfig(AppConfig):
+    name = 'collidersite.blog'
+
+    def ready(self):
+        # Connect the receivers keeping the feed entries up to date
+        from collidersite.blog import signals  # noqa
@@ -0,0 +1,130 @@
+"""
+Atom and RSS feeds of the blog index pages.
+
+Feed readers poll the feeds far more often than posts are published, so the
+entry of each post is rendered once per published revision and stored as a
+BlogFeedEntry: on publish (see blog/signals.py), or on the first feed
+request after that for posts published before entries existed. A feed
+request only loads the stored entries of the latest FEED_SIZE posts and
+writes them out between the feed's own elements, and answers readers that
+already have that version of the feed with a 304.
+"""
+import calendar
+import datetime
+import hashlib
+from io import StringIO
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date, quote_etag
+from django.utils.xmlutils import SimplerXMLGenerator
+
+
+# The number of posts in a feed
+FEED_SIZE = 20
+
+
+class PrerenderedEntriesMixin(object):
+    """
+    Writes the `entries` it is given, rendered beforehand by render_entry,
+    in place of feed items. `updated` is the time of the latest of them.
+    """
+    def __init__(self, entries, updated, *args, **kwargs):
+        super(PrerenderedEntriesMixin, self).__init__(*args, **kwargs)
+        self.entries = entries
+        self.updated = updated
+
+    def latest_post_date(self):
+        return self.updated or super(PrerenderedEntriesMixin, self).latest_post_date()
+
+    def write_items(self, handler):
+        for entry in self.entries:
+            # Written out as it is, without escaping
+            handler.ignorableWhitespace(entry)
+
+
+class AtomFeed(PrerenderedEntriesMixin, Atom1Feed):
+    pass
+
+
+class RssFeed(PrerenderedEntriesMixin, Rss201rev2Feed):
+    pass
+
+
+# The feed classes that render the entries of a format and that assemble
+# the feed out of them
+FEED_FORMATS = {
+    'atom': (Atom1Feed, AtomFeed),
+    'rss': (Rss201rev2Feed, RssFeed),
+}
+
+
+def get_item(post):
+    # The feed item of a BlogPage, as arguments of SyndicationFeed.add_item
+    if post.date_published:
+        pubdate = timezone.make_aware(
+            datetime.datetime.combine(post.date_published, datetime.time.min))
+    else:
+        pubdate = post.first_published_at
+    return {
+        'title': post.title,
+        'link': post.full_url,
+        'description': post.introduction,
+        'unique_id': post.full_url,
+        'pubdate': pubdate,
+        'updateddate': post.last_published_at,
+        'author_name': ', '.join(str(author) for author in post.authors) or None,
+        'categories': [tag.name for tag in post.tags.all()],
+    }
+
+
+def render_entry(post, feed_format):
+    """
+    Return the <entry> (Atom) or <item> (RSS) element of `post` in
+    `feed_format`, as a string.
+    """
+    entry_feed_class = FEED_FORMATS[feed_format][0]
+    feed = entry_feed_class(title='', link='', description='')
+    feed.add_item(**get_item(post))
+    output = StringIO()
+    feed.write_items(SimplerXMLGenerator(output, 'utf-8'))
+    return output.getvalue()
+
+
+def serve_feed(request, index_page, feed_format, feed_url, entries):
+    """
+    Return the response of the `feed_format` feed of `index_page` at the
+    absolute `feed_url`, made of the stored BlogFeedEntry `entries` of its posts,
+    newest first. Its ETag and Last-Modified only change when the entries
+    or the index page do.
+    """
+    dates = [entry.updated for entry in entries]
+    if index_page.last_published_at:
+        dates.append(index_page.last_published_at)
+    updated = max(dates) if dates else None
+    feed_class = FEED_FORMATS[feed_format][1]
+    feed = feed_class(
+        [getattr(entry, feed_format) for entry in entries],
+        updated,
+        title=index_page.title,
+        link=index_page.full_url,
+        description=index_page.introduction,
+        feed_url=feed_url,
+        language=settings.LANGUAGE_CODE,
+    )
+
+    version = ';'.join(
+        ['{}:{}'.format(entry.page_id, entry.updated.isoformat()) for entry in entries] +
+        [feed_format, str(index_page.pk), str(index_page.last_published_at)])
+    etag = quote_etag(hashlib.sha1(version.encode('utf-8')).hexdigest())
+    last_modified = calendar.timegm(updated.utctimetuple()) if updated else None
+
+    response = HttpResponse(feed.writeString('utf-8'), content_type=feed.content_type)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.5 on 2026-10-18 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_auto_20180129_2313'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpage',
+            index=models.Index(fields=['date_published', 'page_ptr'], name='blog_date_published_idx'),
+        ),
+    ]
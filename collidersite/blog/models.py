@@ -2,12 +2,17 @@ from __future__ import unicode_literals
 
 from django.contrib import messages
 from django.db import models
+from django.db.models import F, Prefetch, Q
 from django.shortcuts import redirect, render
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from django.utils import timezone
+from django.utils.http import urlencode
 
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 
-from taggit.models import Tag, TaggedItemBase
+from taggit.models import TaggedItemBase
 
 from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin, route
 from wagtail.wagtailadmin.edit_handlers import FieldPanel, InlinePanel, StreamFieldPanel
@@ -18,6 +23,11 @@ from wagtail.wagtailsearch import index
 from wagtail.wagtailsnippets.edit_handlers import SnippetChooserPanel
 
 from collidersite.base.blocks import BaseStreamBlock
+from collidersite.base.images import prefetch_renditions
+from collidersite.base.tagging import (
+    get_child_tag, get_child_tags, paginate_tagged_pages, sort_by_ids
+)
+from collidersite.blog.feeds import FEED_SIZE, render_entry, serve_feed
 
 
 class BlogPeopleRelationship(Orderable, models.Model):
@@ -47,6 +57,12 @@ class BlogPageTag(TaggedItemBase):
     """
     content_object = ParentalKey('BlogPage', related_name='tagged_items', on_delete=models.CASCADE)
 
+    class Meta:
+        # For the tag archive, see base/tagging.py
+        indexes = [
+            models.Index(fields=['tag', 'content_object'], name='blog_tag_content_object_idx'),
+        ]
+
 
 class BlogPage(Page):
     """
@@ -92,6 +108,7 @@ class BlogPage(Page):
         index.SearchField('body'),
     ]
 
+    @cached_property
     def authors(self):
         """
         Returns the BlogPage's related People. Again note that we are using
@@ -99,24 +116,41 @@ class BlogPage(Page):
         to access these objects. This allows us to access the People objects
         with a loop on the template. If we tried to access the blog_person_
         relationship directly we'd print `blog.BlogPeopleRelationship.None`
+
+        Listings load them in bulk, see BlogIndexPage.prefetch_cards; either
+        way they are looked up once per page object.
         """
+        relationships = getattr(self, 'prefetched_authors', None)
+        if relationships is None:
+            relationships = self.blog_person_relationship.select_related(
+                'people__image')
         authors = [
-            n.people for n in self.blog_person_relationship.all()
+            n.people for n in relationships
         ]
 
         return authors
 
-    @property
+    @cached_property
+    def index_url(self):
+        # The URL of the BlogIndexPage above, which the tag archives are
+        # under. Listings set it for all their posts at once.
+        return self.get_parent().url
+
+    @cached_property
     def get_tags(self):
         """
         Similar to the authors function above we're returning all the tags that
         are related to the blog post into a list we can access on the template.
         We're additionally adding a URL to access BlogPage objects with that tag
         """
-        tags = self.tags.all()
+        tagged_items = getattr(self, 'prefetched_tags', None)
+        if tagged_items is None:
+            tags = list(self.tags.all())
+        else:
+            tags = [tagged_item.tag for tagged_item in tagged_items]
         for tag in tags:
             tag.url = '/'+'/'.join(s.strip('/') for s in [
-                self.get_parent().url,
+                self.index_url,
                 'tags',
                 tag.slug
             ])
@@ -129,6 +163,99 @@ class BlogPage(Page):
     # Empty list means that no child content types are allowed.
     subpage_types = []
 
+    class Meta:
+        # For the pages of the blog index, see BlogIndexPage.get_posts_page
+        indexes = [
+            models.Index(fields=['date_published', 'page_ptr'], name='blog_date_published_idx'),
+        ]
+
+
+class BlogFeedEntry(models.Model):
+    """
+    The Atom and RSS entries of a BlogPage, as rendered from its live
+    revision by blog/feeds.py. Made when the page is published (see
+    blog/signals.py), and when a feed finds it missing or out of date.
+    """
+    page = models.OneToOneField(
+        'BlogPage',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_entry'
+    )
+    # The revision the entries were rendered from
+    revision = models.ForeignKey(
+        'wagtailcore.PageRevision',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    updated = models.DateTimeField()
+    atom = models.TextField()
+    rss = models.TextField()
+
+    def __str__(self):
+        return 'Feed entry of page {}'.format(self.page_id)
+
+    @classmethod
+    def get_for(cls, post):
+        """
+        Return the entry of `post`, rendering it if it doesn't exist yet or
+        is of an earlier revision. Use select_related('feed_entry') to look
+        up the entries of several posts at once.
+        """
+        try:
+            entry = post.feed_entry
+        except cls.DoesNotExist:
+            entry = None
+        if entry is not None and entry.revision_id == post.live_revision_id:
+            return entry
+        return cls.update_for(post)
+
+    @classmethod
+    def update_for(cls, post):
+        # Render the entries of the live revision of `post`
+        entry, created = cls.objects.update_or_create(page=post, defaults={
+            'revision_id': post.live_revision_id,
+            'updated': post.last_published_at or timezone.now(),
+            'atom': render_entry(post, 'atom'),
+            'rss': render_entry(post, 'rss'),
+        })
+        post.feed_entry = entry
+        return entry
+
+
+def get_cursor(post):
+    """
+    Returns the position of `post` in the blog index, newest first, as
+    "<date published>.<id>" (the date is empty for posts without one).
+    """
+    date_published = post.date_published.isoformat() if post.date_published else ''
+    return '{}.{}'.format(date_published, post.pk)
+
+
+def get_posts_after(cursor):
+    """
+    Returns a filter for the posts that come after `cursor` (see get_cursor)
+    in the blog index, or None if it isn't a valid cursor. Posts without a
+    date come last.
+    """
+    date_published, dot, post_id = (cursor or '').rpartition('.')
+    try:
+        post_id = int(post_id)
+        date_published = parse_date(date_published) if date_published else None
+    except ValueError:
+        return None
+    if not dot:
+        return None
+    if date_published is None:
+        return Q(date_published__isnull=True, pk__lt=post_id)
+    return (
+        Q(date_published__lt=date_published) |
+        Q(date_published=date_published, pk__lt=post_id) |
+        Q(date_published__isnull=True)
+    )
+
 
 class BlogIndexPage(RoutablePageMixin, Page):
     """
@@ -159,44 +286,124 @@ class BlogIndexPage(RoutablePageMixin, Page):
     # Speficies that only BlogPage objects can live under this index page
     subpage_types = ['BlogPage']
 
+    # The number of posts per page of the index and of its tag archives, and
+    # per fragment of its infinite scroll
+    POSTS_PER_PAGE = 10
+    TAG_ARCHIVE_PER_PAGE = POSTS_PER_PAGE
+
     # Defines a method to access the children of the page (e.g. BlogPage
     # objects). On the demo site we use this on the HomePage
     def children(self):
         return self.get_children().specific().live()
 
-    # Overrides the context to list all child items, that are live, by the
-    # date that they were published
+    # Overrides the context to list the child items that are live, by the
+    # date that they were published, a page at a time
     # http://docs.wagtail.io/en/latest/getting_started/tutorial.html#overriding-context
     def get_context(self, request):
         context = super(BlogIndexPage, self).get_context(request)
-        context['posts'] = BlogPage.objects.descendant_of(
-            self).live().order_by(
-            '-date_published')
+        context.update(self.get_posts_page(request))
         return context
 
+    def get_posts_page(self, request):
+        """
+        Returns the POSTS_PER_PAGE posts that follow the `after` cursor of
+        the request (from the newest if there is none), with the URLs of
+        the next page and of the next page's cards alone.
+
+        Pages are found by their position in (date published, id) order
+        rather than an offset, so each one costs the same however far
+        back it is, and posts published meanwhile don't shift them.
+        """
+        posts = self.get_posts().order_by(
+            F('date_published').desc(nulls_last=True), '-pk')
+        after = get_posts_after(request.GET.get('after'))
+        if after is not None:
+            posts = posts.filter(after)
+        posts = self.prefetch_cards(posts, limit=self.POSTS_PER_PAGE + 1)
+
+        next_url = next_fragment_url = None
+        if len(posts) > self.POSTS_PER_PAGE:
+            posts = posts[:self.POSTS_PER_PAGE]
+            query = '?' + urlencode({'after': get_cursor(posts[-1])})
+            next_url = self.url + query
+            next_fragment_url = self.url + self.reverse_subpage('posts') + query
+        return {
+            'posts': posts,
+            'next_url': next_url,
+            'next_fragment_url': next_fragment_url,
+        }
+
+    def get_page_cursors(self):
+        """
+        Returns the `after` cursors of the pages of the index that follow
+        the first, in order, as the next page links of get_posts_page give
+        them.
+        """
+        posts = list(self.get_posts().order_by(
+            F('date_published').desc(nulls_last=True), '-pk',
+        ).only('pk', 'date_published'))
+        return [
+            get_cursor(post)
+            for post in posts[self.POSTS_PER_PAGE - 1:-1:self.POSTS_PER_PAGE]
+        ]
+
+    # The cards of the next page of posts, without the rest of the page, for
+    # the infinite scroll of the index
+    @route(r'^posts/$', name='posts')
+    def posts_fragment(self, request):
+        context = self.get_posts_page(request)
+        context['page'] = self
+        return render(request, 'blog/include/post_cards.html', context)
+
     # This defines a Custom view that utilizes Tags. This view will return all
     # related BlogPages for a given Tag or redirect back to the BlogIndexPage.
     # More information on RoutablePages is at
     # http://docs.wagtail.io/en/latest/reference/contrib/routablepage.html
     @route('^tags/$', name='tag_archive')
-    @route('^tags/(\w+)/$', name='tag_archive')
+    @route('^tags/([-\w]+)/$', name='tag_archive')
     def tag_archive(self, request, tag=None):
 
-        try:
-            tag = Tag.objects.get(slug=tag)
-        except Tag.DoesNotExist:
-            if tag:
-                msg = 'There are no blog posts tagged with "{}"'.format(tag)
+        slug = tag
+        tag = get_child_tag(self, BlogPageTag, slug)
+        if tag is None:
+            if slug:
+                msg = 'There are no blog posts tagged with "{}"'.format(slug)
                 messages.add_message(request, messages.INFO, msg)
             return redirect(self.url)
 
-        posts = self.get_posts(tag=tag)
+        posts = paginate_tagged_pages(
+            self, BlogPageTag, tag, request.GET.get('page'), self.POSTS_PER_PAGE,
+            ordering=(
+                F('content_object__date_published').desc(nulls_last=True),
+                '-content_object_id'))
+        posts.object_list = sort_by_ids(self.prefetch_cards(
+            self.get_posts().filter(pk__in=posts.object_list)), posts.object_list)
         context = {
+            'page': self,
             'tag': tag,
-            'posts': posts
+            'posts': posts,
         }
+        if posts.has_next():
+            context['next_url'] = '?' + urlencode({'page': posts.next_page_number()})
         return render(request, 'blog/blog_index_page.html', context)
 
+    # The Atom and RSS feeds of the latest posts, see blog/feeds.py
+    @route(r'^feed/$', name='feed')
+    def atom_feed(self, request):
+        return self.serve_feed(request, 'atom', 'feed')
+
+    @route(r'^feed/rss/$', name='rss_feed')
+    def rss_feed(self, request):
+        return self.serve_feed(request, 'rss', 'rss_feed')
+
+    def serve_feed(self, request, feed_format, route_name):
+        posts = self.get_posts().select_related('feed_entry').order_by(
+            F('date_published').desc(nulls_last=True), '-pk')[:FEED_SIZE]
+        entries = [BlogFeedEntry.get_for(post) for post in posts]
+        return serve_feed(
+            request, self, feed_format,
+            self.full_url + self.reverse_subpage(route_name), entries)
+
     def serve_preview(self, request, mode_name):
         # Needed for previews to work
         return self.serve(request)
@@ -209,11 +416,30 @@ class BlogIndexPage(RoutablePageMixin, Page):
             posts = posts.filter(tags=tag)
         return posts
 
-    # Returns the list of Tags for all child posts of this BlogPage.
+    # Returns the posts (the first `limit` of them) as a list, with their
+    # images, authors, tags and the renditions shown on the cards of the
+    # index loaded in bulk
+    def prefetch_cards(self, posts, limit=None):
+        posts = posts.select_related('image').prefetch_related(
+            Prefetch(
+                'blog_person_relationship',
+                queryset=BlogPeopleRelationship.objects.select_related(
+                    'people').order_by('sort_order'),
+                to_attr='prefetched_authors'),
+            Prefetch(
+                'tagged_items',
+                queryset=BlogPageTag.objects.select_related('tag'),
+                to_attr='prefetched_tags'),
+        )
+        if limit is not None:
+            posts = posts[:limit]
+        posts = list(posts)
+        for post in posts:
+            post.index_url = self.url
+        prefetch_renditions([post.image for post in posts], 'fill-900x300-c50')
+        return posts
+
+    # Returns the list of Tags of all live child posts of this page, each
+    # with the number of posts tagged with it. See base/tagging.py.
     def get_child_tags(self):
-        tags = []
-        for post in self.get_posts():
-            # Not tags.append() because we don't want a list of lists
-            tags += post.get_tags
-        tags = sorted(set(tags))
-        return tags
+        return get_child_tags(self, BlogPageTag)
@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+
+from wagtail.wagtailcore.signals import page_published
+
+from collidersite.blog.models import BlogFeedEntry, BlogPage
+
+
+@receiver(page_published, sender=BlogPage)
+def post_published(sender, instance, **kwargs):
+    # Only the entry of the published post changes in the feeds
+    BlogFeedEntry.update_for(instance)
@@ -0,0 +1,48 @@
+import datetime
+
+from django.db.models import F
+from django.test import TestCase
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.blog.models import BlogIndexPage, BlogPage, get_cursor, get_posts_after
+
+
+class PostCursorTests(TestCase):
+    """
+    The blog index is paginated by position in (date published, id) order,
+    newest first and posts without a date last.
+    """
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        self.index = root.add_child(instance=BlogIndexPage(title='Blog', slug='blog'))
+        dates = [
+            datetime.date(2017, 3, 1), None, datetime.date(2017, 1, 1),
+            datetime.date(2017, 3, 1), None, datetime.date(2016, 12, 31),
+        ]
+        for i, date in enumerate(dates):
+            self.index.add_child(instance=BlogPage(
+                title='Post {}'.format(i), slug='post-{}'.format(i), date_published=date))
+        self.posts = list(self.index.get_posts().order_by(
+            F('date_published').desc(nulls_last=True), '-pk'))
+
+    def test_order(self):
+        dates = [post.date_published for post in self.posts]
+        self.assertEqual(dates[-2:], [None, None])
+        self.assertEqual(dates[:4], sorted(dates[:4], reverse=True))
+
+    def test_posts_after(self):
+        for position, post in enumerate(self.posts):
+            after = self.index.get_posts().filter(get_posts_after(get_cursor(post)))
+            self.assertEqual(
+                set(after.values_list('pk', flat=True)),
+                set(later.pk for later in self.posts[position + 1:]))
+
+    def test_invalid_cursor(self):
+        for cursor in (None, '', '12', '2017-13-01.4', 'date.id'):
+            self.assertIsNone(get_posts_after(cursor))
+
+    def test_page_cursors(self):
+        self.index.POSTS_PER_PAGE = 2
+        self.assertEqual(self.index.get_page_cursors(), [
+            get_cursor(self.posts[1]), get_cursor(self.posts[3])])
@@ -191,9 +191,13 @@ class BreadsIndexPage(Page):
 
     # Pagination for the index page. We use the `django.core.paginator` as any
     # standard Django app would, but the difference here being we have it as a
-    # method on the model rather than within a view function
+    # method on the model rather than within a view function. The static
+    # export and benchmark_pages find the pages of the index through
+    # `paginate_param`.
+    paginate_param = 'page'
+
     def paginate(self, request, *args):
-        page = request.GET.get('page')
+        page = request.GET.get(self.paginate_param)
         paginator = Paginator(self.get_breads(), 12)
         try:
             pages = paginator.page(page)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.5 on 2026-10-18 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('industries', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='industrypage',
+            name='people_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.5 on 2026-10-18 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('industries', '0002_industrypage_people_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='industrypagetag',
+            index=models.Index(fields=['tag', 'content_object'], name='industries_tag_industry_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django import forms
+from django.contrib import messages
 from django.db import models
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.utils.functional import cached_property
 
-from taggit.models import Tag, TaggedItemBase
+from taggit.models import TaggedItemBase
 from modelcluster.fields import ParentalManyToManyField
 
 from wagtail.wagtailadmin.edit_handlers import (
@@ -19,6 +21,11 @@ from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin, route
 from django.shortcuts import redirect, render
 
 from collidersite.base.blocks import BaseStreamBlock
+from collidersite.base.images import prefetch_renditions
+from collidersite.base.people import get_listed_people
+from collidersite.base.tagging import (
+    get_child_tag, get_child_tags, paginate_tagged_pages, sort_by_ids
+)
 
 
 
@@ -30,6 +37,12 @@ class IndustryPageTag(TaggedItemBase):
     """
     content_object = ParentalKey('IndustryPage', related_name='tagged_industries', on_delete=models.CASCADE)
 
+    class Meta:
+        # For the tag archive, see base/tagging.py
+        indexes = [
+            models.Index(fields=['tag', 'content_object'], name='industries_tag_industry_idx'),
+        ]
+
 
 
 class IndustryPage(Page):
@@ -52,6 +65,9 @@ class IndustryPage(Page):
     )
 
     tags = ClusterTaggableManager(through=IndustryPageTag, blank=True)
+    # The number of live people covering this page, kept up to date by
+    # collidersite/people/signals.py
+    people_count = models.PositiveIntegerField(default=0, editable=False)
 
     content_panels = Page.content_panels + [
         FieldPanel('introduction', classname="full"),
@@ -76,10 +92,11 @@ class IndustryPage(Page):
             ])
         return tags
 
-    @property
+    # The live people covering this page, loaded once per request with what
+    # the template shows of them
+    @cached_property
     def get_people(self):
-        people = self.people_industries.all()
-        return people
+        return get_listed_people(self.people_industries.all())
 
     search_fields = Page.search_fields + [
         index.SearchField('body'),
@@ -113,6 +130,10 @@ class IndustriesIndexPage(RoutablePageMixin, Page):
         ImageChooserPanel('image'),
     ]
 
+    # The number of industries per page of the tag archives
+    INDUSTRIES_PER_PAGE = 6
+    TAG_ARCHIVE_PER_PAGE = INDUSTRIES_PER_PAGE
+
     # Returns a queryset of IndustryPage objects that are live, that are direct
     # descendants of this index page with most recent first
     def get_industries(self, tag=None):
@@ -121,6 +142,14 @@ class IndustriesIndexPage(RoutablePageMixin, Page):
             industries = industries.filter(tags=tag)
         return industries
 
+    # Returns the industries as a list, with their images and the renditions
+    # shown on the cards of the index loaded in bulk
+    def prefetch_cards(self, industries):
+        industries = list(industries.select_related('image'))
+        prefetch_renditions(
+            [industry.image for industry in industries], 'fill-600x600-c100')
+        return industries
+
     # Allows child objects (e.g. IndustryPage objects) to be accessible via the
     # template. We use this on the HomePage to display child items of featured
     # content
@@ -131,7 +160,7 @@ class IndustriesIndexPage(RoutablePageMixin, Page):
         context = super(IndustriesIndexPage, self).get_context(request)
 
         # IndustryPage objects (get_industries) are passed through pagination
-        industries = self.get_industries()
+        industries = self.prefetch_cards(self.get_industries())
         context['industries'] = industries
         return context
 
@@ -142,19 +171,23 @@ class IndustriesIndexPage(RoutablePageMixin, Page):
 
 
     @route('^tags/$', name='tag_archive')
-    @route('^tags/(\w+)/$', name='tag_archive')
+    @route('^tags/([-\w]+)/$', name='tag_archive')
     def tag_archive(self, request, tag=None):
 
-        try:
-            tag = Tag.objects.get(slug=tag)
-        except Tag.DoesNotExist:
-            if tag:
-                msg = 'There are no industries tagged with "{}"'.format(tag)
+        slug = tag
+        tag = get_child_tag(self, IndustryPageTag, slug)
+        if tag is None:
+            if slug:
+                msg = 'There are no industries tagged with "{}"'.format(slug)
                 messages.add_message(request, messages.INFO, msg)
             return redirect(self.url)
 
-        industries = self.get_industries(tag=tag)
+        industries = paginate_tagged_pages(
+            self, IndustryPageTag, tag, request.GET.get('page'), self.INDUSTRIES_PER_PAGE)
+        industries.object_list = sort_by_ids(self.prefetch_cards(
+            self.get_industries().filter(pk__in=industries.object_list)), industries.object_list)
         context = {
+            'page': self,
             'tag': tag,
             'industries': industries
         }
@@ -168,11 +201,7 @@ class IndustriesIndexPage(RoutablePageMixin, Page):
     # If a tag is used then it will filter the posts by tag.
 
 
-    # Returns the list of Tags for all child posts of this BlogPage.
+    # Returns the list of Tags of all live child industries of this page, each
+    # with the number of industries tagged with it. See base/tagging.py.
     def get_child_tags(self):
-        tags = []
-        for industry in self.get_industries():
-            # Not tags.append() because we don't want a list of lists
-            tags += industry.get_tags
-        tags = sorted(set(tags))
-        return tags
\ No newline at end of file
+        return get_child_tags(self, IndustryPageTag)
\ No newline at end of file
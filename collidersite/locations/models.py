@@ -3,6 +3,7 @@ from datetime import datetime
 from django.conf import settings
 from django.core.validators import RegexValidator
 from django.db import models
+from django.utils.functional import cached_property
 
 from modelcluster.fields import ParentalKey
 
@@ -13,6 +14,8 @@ from wagtail.wagtailsearch import index
 from wagtail.wagtailimages.edit_handlers import ImageChooserPanel
 
 from collidersite.base.blocks import BaseStreamBlock
+from collidersite.base.images import prefetch_renditions
+from collidersite.base.people import get_listed_people
 from collidersite.locations.choices import DAY_CHOICES
 
 
@@ -113,9 +116,12 @@ class LocationsIndexPage(Page):
     # http://docs.wagtail.io/en/latest/getting_started/tutorial.html#overriding-context
     def get_context(self, request):
         context = super(LocationsIndexPage, self).get_context(request)
-        context['locations'] = LocationPage.objects.descendant_of(
+        locations = list(LocationPage.objects.descendant_of(
             self).live().order_by(
-            'title')
+            'title').select_related('image'))
+        prefetch_renditions(
+            [location.image for location in locations], 'fill-180x180-c75')
+        context['locations'] = locations
         return context
 
     content_panels = Page.content_panels + [
@@ -156,6 +162,9 @@ class LocationPage(Page):
             ),
         ]
     )
+    # The number of live people covering this page, kept up to date by
+    # collidersite/people/signals.py
+    people_count = models.PositiveIntegerField(default=0, editable=False)
 
     # Search index configuration
     search_fields = Page.search_fields + [
@@ -184,10 +193,11 @@ class LocationPage(Page):
         hours = self.hours_of_operation.all()
         return hours
 
-    @property
+    # The live people covering this page, loaded once per request with what
+    # the template shows of them
+    @cached_property
     def get_people(self):
-        people = self.covered_markets.all()
-        return people
+        return get_listed_people(self.covered_markets.all())
 
     # Determines if the location is currently open. It is timezone naive
     def is_open(self):
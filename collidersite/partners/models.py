@@ -1,8 +1,10 @@
 from django import forms
+from django.contrib import messages
 from django.db import models
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.utils.functional import cached_property
 
-from taggit.models import Tag, TaggedItemBase
+from taggit.models import TaggedItemBase
 from modelcluster.fields import ParentalManyToManyField
 
 from wagtail.wagtailadmin.edit_handlers import (
@@ -19,6 +21,11 @@ from wagtail.contrib.wagtailroutablepage.models import RoutablePageMixin, route
 from django.shortcuts import redirect, render
 
 from collidersite.base.blocks import BaseStreamBlock
+from collidersite.base.images import prefetch_renditions
+from collidersite.base.people import get_listed_people
+from collidersite.base.tagging import (
+    get_child_tag, get_child_tags, paginate_tagged_pages, sort_by_ids
+)
 
 
 
@@ -51,6 +58,12 @@ class PartnerPageTag(TaggedItemBase):
     """
     content_object = ParentalKey('PartnerPage', related_name='tagged_partners', on_delete=models.CASCADE)
 
+    class Meta:
+        # For the tag archive, see base/tagging.py
+        indexes = [
+            models.Index(fields=['tag', 'content_object'], name='partners_tag_partner_idx'),
+        ]
+
 
 
 @register_snippet
@@ -115,6 +128,9 @@ class PartnerPage(Page):
         related_name='+'
     )
     tags = ClusterTaggableManager(through=PartnerPageTag, blank=True)
+    # The number of live people covering this page, kept up to date by
+    # collidersite/people/signals.py
+    people_count = models.PositiveIntegerField(default=0, editable=False)
 
     content_panels = Page.content_panels + [
         FieldPanel('introduction', classname="full"),
@@ -141,10 +157,11 @@ class PartnerPage(Page):
             ])
         return tags
 
-    @property
+    # The live people covering this page, loaded once per request with what
+    # the template shows of them
+    @cached_property
     def get_people(self):
-        people = self.people_covering.all()
-        return people
+        return get_listed_people(self.people_covering.all())
 
     search_fields = Page.search_fields + [
         index.SearchField('body'),
@@ -184,6 +201,10 @@ class PartnersIndexPage(RoutablePageMixin, Page):
     # Can only have PartnerPage children
     subpage_types = ['PartnerPage']
 
+    # The number of partners per page of the index and of its tag archives
+    PARTNERS_PER_PAGE = 6
+    TAG_ARCHIVE_PER_PAGE = PARTNERS_PER_PAGE
+
     # Returns a queryset of PartnerPage objects that are live, that are direct
     # descendants of this index page with most recent first
     def get_partners(self, tag=None):
@@ -200,19 +221,32 @@ class PartnersIndexPage(RoutablePageMixin, Page):
 
     # Pagination for the index page. We use the `django.core.paginator` as any
     # standard Django app would, but the difference here being we have it as a
-    # method on the model rather than within a view function
+    # method on the model rather than within a view function. The static
+    # export and benchmark_pages find the pages of the index through
+    # `paginate_param`.
+    paginate_param = 'page'
 
     def paginate(self, request, *args):
-        page = request.GET.get('page')
-        paginator = Paginator(self.get_partners(), 6)
+        page = request.GET.get(self.paginate_param)
+        paginator = Paginator(self.get_partners(), self.PARTNERS_PER_PAGE)
         try:
             pages = paginator.page(page)
         except PageNotAnInteger:
             pages = paginator.page(1)
         except EmptyPage:
             pages = paginator.page(paginator.num_pages)
+        # Only the partners on this page need their images and renditions
+        pages.object_list = self.prefetch_cards(pages.object_list)
         return pages
 
+    # Returns the partners as a list, with their images and the renditions
+    # shown on the cards of the index loaded in bulk
+    def prefetch_cards(self, partners):
+        partners = list(partners.select_related('image'))
+        prefetch_renditions(
+            [partner.image for partner in partners], 'fill-600x600-c100')
+        return partners
+
     # Returns the above to the get_context method that is used to populate the
     # template
     def get_context(self, request):
@@ -232,19 +266,23 @@ class PartnersIndexPage(RoutablePageMixin, Page):
 
 
     @route('^tags/$', name='tag_archive')
-    @route('^tags/(\w+)/$', name='tag_archive')
+    @route('^tags/([-\w]+)/$', name='tag_archive')
     def tag_archive(self, request, tag=None):
 
-        try:
-            tag = Tag.objects.get(slug=tag)
-        except Tag.DoesNotExist:
-            if tag:
-                msg = 'There are no partners tagged with "{}"'.format(tag)
+        slug = tag
+        tag = get_child_tag(self, PartnerPageTag, slug)
+        if tag is None:
+            if slug:
+                msg = 'There are no partners tagged with "{}"'.format(slug)
                 messages.add_message(request, messages.INFO, msg)
             return redirect(self.url)
 
-        partners = self.get_partners(tag=tag)
+        partners = paginate_tagged_pages(
+            self, PartnerPageTag, tag, request.GET.get('page'), self.PARTNERS_PER_PAGE)
+        partners.object_list = sort_by_ids(self.prefetch_cards(
+            self.get_partners().filter(pk__in=partners.object_list)), partners.object_list)
         context = {
+            'page': self,
             'tag': tag,
             'partners': partners
         }
@@ -258,11 +296,7 @@ class PartnersIndexPage(RoutablePageMixin, Page):
     # If a tag is used then it will filter the posts by tag.
 
 
-    # Returns the list of Tags for all child posts of this BlogPage.
+    # Returns the list of Tags of all live child partners of this page, each
+    # with the number of partners tagged with it. See base/tagging.py.
     def get_child_tags(self):
-        tags = []
-        for partner in self.get_partners():
-            # Not tags.append() because we don't want a list of lists
-            tags += partner.get_tags
-        tags = sorted(set(tags))
-        return tags
\ No newline at end of file
+        return get_child_tags(self, PartnerPageTag)
\ No newline at end of file
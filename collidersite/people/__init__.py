@@ -0,0 +1 @@
+default_app_config = 'collidersite.people.apps.PeopleConfig'
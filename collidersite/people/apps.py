@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PeopleConfig(AppConfig):
+    name = 'collidersite.people'
+
+    def ready(self):
+        # Connect the receivers keeping people counts up to date
+        from collidersite.people import signals  # noqa
@@ -0,0 +1,65 @@
+"""
+The people_count of location, partner and industry pages: the number of live
+people linked to each through the covered_markets, partners and industries
+fields of Person. Kept up to date by collidersite/people/signals.py, and
+recomputed in bulk by the update_people_counts management command.
+"""
+from django.db.models import Count
+
+from collidersite.people.models import Person
+
+
+# The Person fields linking people to pages with a people_count
+COVERAGE_FIELDS = ['covered_markets', 'partners', 'industries']
+
+
+def get_through_fields(field_name):
+    """
+    Return the through model of the `field_name` field of Person and the
+    names of its foreign keys to the person and to the page.
+    """
+    field = Person._meta.get_field(field_name)
+    return field.remote_field.through, field.m2m_field_name(), field.m2m_reverse_field_name()
+
+
+def get_linked_page_ids(field_name, person_ids):
+    # The ids of the pages the people with `person_ids` link to
+    through, person_field, page_field = get_through_fields(field_name)
+    return set(through.objects.filter(
+        **{person_field + '_id__in': person_ids}).values_list(page_field + '_id', flat=True))
+
+
+def update_people_counts(field_name, page_ids=None):
+    """
+    Recompute the people_count of the pages linked to through the
+    `field_name` field of Person, of those with `page_ids` or of all of
+    them. Only the counts that changed are written, one UPDATE per value.
+    Returns the number of pages updated.
+    """
+    if page_ids is not None and not page_ids:
+        return 0
+    through, person_field, page_field = get_through_fields(field_name)
+    model = Person._meta.get_field(field_name).related_model
+
+    links = through.objects.filter(**{person_field + '__live': True})
+    pages = model.objects.all()
+    if page_ids is not None:
+        links = links.filter(**{page_field + '_id__in': page_ids})
+        pages = pages.filter(id__in=page_ids)
+    counts = dict(links.values_list(page_field + '_id').annotate(
+        count=Count(person_field + '_id', distinct=True)).order_by())
+
+    changed = {}
+    for page_id, people_count in pages.values_list('id', 'people_count'):
+        count = counts.get(page_id, 0)
+        if count != people_count:
+            changed.setdefault(count, []).append(page_id)
+    for count, ids in changed.items():
+        model.objects.filter(id__in=ids).update(people_count=count)
+    return sum(len(ids) for ids in changed.values())
+
+
+def update_person_counts(person_ids):
+    # Recompute the counts of every page the people with `person_ids` link to
+    for field_name in COVERAGE_FIELDS:
+        update_people_counts(field_name, get_linked_page_ids(field_name, person_ids))
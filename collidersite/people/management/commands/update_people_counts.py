@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from collidersite.people.coverage import COVERAGE_FIELDS, update_people_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the people_count of every location, partner and industry "
+        "page, in case it went out of step with the people covering them "
+        "(e.g. after a bulk import that bypassed the signals)."
+    )
+
+    def handle(self, **options):
+        for field_name in COVERAGE_FIELDS:
+            updated = update_people_counts(field_name)
+            self.stdout.write("{}: updated {} pages".format(field_name, updated))
@@ -1,6 +1,5 @@
 from django import forms
 from django.db import models
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from modelcluster.fields import ParentalManyToManyField
 from modelcluster.models import ClusterableModel
@@ -15,6 +14,7 @@ from wagtail.wagtailsnippets.models import register_snippet
 from wagtail.wagtailimages.edit_handlers import ImageChooserPanel
 
 from collidersite.base.blocks import BaseStreamBlock
+from collidersite.base.images import prefetch_renditions
 from collidersite.locations.models import LocationPage
 from collidersite.partners.models import PartnerPage
 from collidersite.industries.models import IndustryPage
@@ -181,29 +181,32 @@ class PeopleIndexPage(Page):
     def children(self):
         return self.get_children().specific().live()
 
-    # Pagination for the index page. We use the `django.core.paginator` as any
-    # standard Django app would, but the difference here being we have it as a
-    # method on the model rather than within a view function
-    def paginate(self, request, *args):
-        page = request.GET.get('page')
-        paginator = Paginator(self.get_people(), 12)
-        try:
-            pages = paginator.page(page)
-        except PageNotAnInteger:
-            pages = paginator.page(1)
-        except EmptyPage:
-            pages = paginator.page(paginator.num_pages)
-        return pages
-
-    # Returns the above to the get_context method that is used to populate the
-    # template
     def get_context(self, request):
         context = super(PeopleIndexPage, self).get_context(request)
-        people = self.get_people()
+        people = self.get_listed_people()
         context['people'] = people
+        context['people_by_type'] = self.group_by_type(people)
 
         return context
 
+    # Returns every live Person below this page in a single query, with
+    # their location, image and thumbnail rendition loaded up front, so the
+    # cost of the index doesn't grow with the number of people
+    def get_listed_people(self):
+        people = list(self.get_people().select_related('location', 'image'))
+        prefetch_renditions(
+            [person.image for person in people], 'fill-100x100-c100')
+        return people
+
+    # Returns a dict of person type (e.g. 'D') to the people of that type,
+    # in the order of `people`
+    def group_by_type(self, people):
+        people_by_type = dict(
+            (person_type, []) for person_type, name in Person.PERSON_TYPE_CHOICES)
+        for person in people:
+            people_by_type.setdefault(person.person_type, []).append(person)
+        return people_by_type
+
 
 
 
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from wagtail.wagtailcore.signals import page_published, page_unpublished
+
+from collidersite.people.coverage import (
+    COVERAGE_FIELDS, get_linked_page_ids, get_through_fields,
+    update_people_counts, update_person_counts
+)
+from collidersite.people.models import Person
+
+
+def people_coverage_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recompute the people_count of the pages whose links to people changed,
+    from either side of the relation. Publishing a Person commits its
+    covered_markets, partners and industries with remove() and add().
+    """
+    field_name = COVERAGE_FIELDS_BY_THROUGH[sender]
+    if reverse:
+        # A page's people were changed through its related manager
+        page_ids = {instance.pk}
+    elif action == 'pre_clear':
+        # Once cleared, the pages a person was linked to can't be found
+        cleared = instance.__dict__.setdefault('_cleared_coverage', {})
+        cleared[field_name] = get_linked_page_ids(field_name, [instance.pk])
+        return
+    elif action == 'post_clear':
+        page_ids = instance.__dict__.get('_cleared_coverage', {}).pop(field_name, set())
+    else:
+        page_ids = pk_set
+    if action.startswith('post_'):
+        update_people_counts(field_name, page_ids)
+
+
+# The Person field of each through model, which are auto-created and so
+# can't be named in @receiver
+COVERAGE_FIELDS_BY_THROUGH = dict(
+    (get_through_fields(field_name)[0], field_name) for field_name in COVERAGE_FIELDS)
+
+for through in COVERAGE_FIELDS_BY_THROUGH:
+    m2m_changed.connect(people_coverage_changed, sender=through)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def person_published(sender, instance, **kwargs):
+    # Only live people are counted
+    if issubclass(sender, Person):
+        update_person_counts([instance.pk])
+
+
+@receiver(page_published)
+def covered_page_published(sender, instance, **kwargs):
+    # Publishing a revision restores the people_count it was saved with
+    for field_name in COVERAGE_FIELDS:
+        if issubclass(sender, Person._meta.get_field(field_name).related_model):
+            update_people_counts(field_name, [instance.pk])
+
+
+@receiver(pre_delete, sender=Person)
+def person_deleted(sender, instance, **kwargs):
+    # The links are deleted along with the person, without m2m_changed, so
+    # the linked pages are recounted once the deletion is committed
+    page_ids = dict(
+        (field_name, get_linked_page_ids(field_name, [instance.pk]))
+        for field_name in COVERAGE_FIELDS)
+    transaction.on_commit(lambda: [
+        update_people_counts(field_name, ids) for field_name, ids in page_ids.items()])
@@ -0,0 +1,54 @@
+from django.test import TestCase
+
+from wagtail.wagtailcore.models import Page
+
+from collidersite.locations.models import LocationPage
+from collidersite.people.coverage import update_people_counts
+from collidersite.people.models import Person
+
+
+class PeopleCountTests(TestCase):
+    """
+    The people_count of a location stays the number of live people covering
+    it, whichever side of the relation changes.
+    """
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        self.locations = [
+            root.add_child(instance=LocationPage(
+                title=name, slug=name.lower(), country='Iceland', city=name,
+                lat_long='64.144367, -21.939182'))
+            for name in ('Reykjavik', 'Akureyri')
+        ]
+        self.person = root.add_child(instance=Person(
+            title='Ada', slug='ada', person_type='T'))
+
+    def assertCounts(self, *counts):
+        self.assertEqual([
+            LocationPage.objects.get(pk=location.pk).people_count
+            for location in self.locations
+        ], list(counts))
+        # The same as a full recount
+        self.assertEqual(update_people_counts('covered_markets'), 0)
+
+    def test_person_side(self):
+        self.person.covered_markets.add(*self.locations)
+        self.person.save()
+        self.assertCounts(1, 1)
+        self.person.covered_markets.remove(self.locations[0])
+        self.person.save()
+        self.assertCounts(0, 1)
+
+    def test_page_side(self):
+        self.locations[0].covered_markets.add(self.person)
+        self.assertCounts(1, 0)
+        self.locations[0].covered_markets.clear()
+        self.assertCounts(0, 0)
+
+    def test_unpublish(self):
+        self.person.covered_markets.add(*self.locations)
+        self.person.save()
+        self.person.unpublish()
+        self.assertCounts(0, 0)
+        self.person.save_revision().publish()
+        self.assertCounts(1, 1)
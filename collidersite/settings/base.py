@@ -72,6 +72,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its timings cover everything below
+    'collidersite.base.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +85,8 @@ MIDDLEWARE = [
     'wagtail.wagtailcore.middleware.SiteMiddleware',
     'wagtail.wagtailredirects.middleware.RedirectMiddleware',
 
+    # Needs the user, session and site set up by the middleware above
+    'collidersite.base.middleware.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'collidersite.urls'
@@ -187,3 +191,53 @@ WAGTAILSTREAMFORMS_FORM_TEMPLATES = (
     ('streamforms/form_block.html', 'Default Form Template'),
     ('streamforms/particle_form.html', 'Particalized Form')
 )
+
+# Full-page cache for anonymous visitors, see base/page_cache.py. Entries are
+# purged on publish, so the timeout only bounds how long unused pages linger.
+# Purges only reach every process through a shared default cache, which
+# base/checks.py requires.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Query parameters that change a page's content and so become part of its
+# cache key. Requests with any other parameter bypass the cache.
+PAGE_CACHE_QUERY_PARAMS = ['page', 'gallery_page', 'after']
+# Serve expired or purged pages for up to PAGE_CACHE_STALE_TIMEOUT more
+# seconds while a single background worker re-renders them. Requires the
+# default cache to be shared between processes (e.g. Redis) for the
+# re-render lock to hold across them.
+PAGE_CACHE_STALE_WHILE_REVALIDATE = True
+PAGE_CACHE_STALE_TIMEOUT = 60 * 60 * 24
+PAGE_CACHE_LOCK_TIMEOUT = 60
+
+# Per-request query count, SQL time, render time and cache hits by page type,
+# see base/metrics.py and the /_metrics/ view (staff only). Totals are
+# written to the default cache every METRICS_FLUSH_INTERVAL seconds. Counting
+# queries logs every SQL statement, so it is only on in development; enable
+# it elsewhere while investigating.
+METRICS_ENABLED = False
+METRICS_FLUSH_INTERVAL = 10
+# Requests over budget are logged as warnings. Keys are page classes,
+# page classes with a route ("BlogIndexPage:tag_archive") or URL names;
+# 'default' applies to everything else. Times are in milliseconds.
+PAGE_BUDGETS = {
+    'default': {'queries': 50, 'time': 500},
+}
+
+# Render missing image renditions inside the request that shows them. When
+# off, the page shows the original image and the rendition is generated by
+# the background worker, see base/renditions.py.
+RENDITIONS_GENERATE_IN_REQUEST = False
+
+# Link missing image renditions to the serve_rendition view, which generates
+# them when the browser first asks for them, instead of generating them or
+# showing the original while rendering the page. Overrides
+# RENDITIONS_GENERATE_IN_REQUEST.
+RENDITIONS_LAZY_URLS = True
+
+# Browser and proxy cache lifetime of the responses of serve_rendition, whose
+# URLs change whenever the image does
+RENDITION_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Also make WebP versions of image renditions, which templates offer to the
+# browsers that support them (if Pillow was built with libwebp)
+RENDITIONS_WEBP = True
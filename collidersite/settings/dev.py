@@ -6,3 +6,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # BASE_URL required for notification emails
 BASE_URL = 'http://localhost:8000'
+
+# Always render pages afresh while developing
+PAGE_CACHE_ENABLED = False
+
+# Query counts and timings by page type at /_metrics/, see base/metrics.py
+METRICS_ENABLED = True
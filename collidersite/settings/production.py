@@ -44,6 +44,10 @@ AWS_REGION = os.getenv('AWS_REGION', '')
 # configure CACHES from CACHE_URL environment variable (defaults to locmem if no CACHE_URL is set)
 CACHES = {'default': django_cache_url.config()}
 
+# Publishes only purge the page cache of every web process through a shared
+# cache, so it stays off until CACHE_URL points at one
+PAGE_CACHE_ENABLED = 'CACHE_URL' in os.environ
+
 # Configure Elasticsearch, if present in os.environ
 ELASTICSEARCH_ENDPOINT = os.getenv('ELASTICSEARCH_ENDPOINT', '')
 
@@ -113,5 +117,9 @@ LOGGING = {
             'handlers': ['console'],
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
         },
+        'collidersite.base.metrics': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
     },
 }
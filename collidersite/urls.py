@@ -6,6 +6,7 @@ from wagtail.wagtailadmin import urls as wagtailadmin_urls
 from wagtail.wagtaildocs import urls as wagtaildocs_urls
 from wagtail.wagtailcore import urls as wagtail_urls
 
+from collidersite.base import views as base_views
 from collidersite.search import views as search_views
 
 urlpatterns = [
@@ -15,6 +16,11 @@ urlpatterns = [
     url(r'^documents/', include(wagtaildocs_urls)),
 
     url(r'^search/$', search_views.search, name='search'),
+    url(r'^_metrics/$', base_views.request_metrics, name='request_metrics'),
+    url(r'^renditions/([^/]+)/(\d+)/([^/]+)/(\w+)/$', base_views.serve_rendition,
+        name='serve_rendition'),
+    url(r'^renditions/([^/]+)/(\d+)/([^/]+)/(\w+)/webp/$', base_views.serve_rendition,
+        {'output_format': 'webp'}, name='serve_rendition_webp'),
 
 ]
 